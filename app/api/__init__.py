@@ -3,6 +3,6 @@ API module
 """
 
 from .router import router
-from .middleware import APIKeyMiddleware
+from .security import require_api_key
 
-__all__ = ["router", "APIKeyMiddleware"]
+__all__ = ["router", "require_api_key"]
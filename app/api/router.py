@@ -2,12 +2,14 @@
 API Router - Main honeypot endpoint
 """
 
+import asyncio
 import logging
-import json
-from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, AsyncIterator
 
-from fastapi import APIRouter, HTTPException, Request
+import orjson
+from pydantic import ValidationError
+from fastapi import APIRouter, Depends, Header, HTTPException, Request
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
 
 from app.models import (
     MessageRequest,
@@ -15,35 +17,153 @@ from app.models import (
     ConversationTurn,
     ConversationHistory,
     AgentState,
+    Intelligence,
+    EngagementMetrics,
+    ScamDetectionResult,
 )
-from app.memory import get_memory_store
-from app.services.detection import get_detection_service
-from app.services.extractor import get_extractor_service
-from app.services.metrics import get_metrics_service
-from app.agents import get_honeypot_agent
+from app.models.schemas import utc_now
+from app.api.security import require_api_key
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter(prefix="/honeypot", tags=["honeypot"])
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+router = APIRouter(
+    prefix="/honeypot",
+    tags=["honeypot"],
+    dependencies=[Depends(require_api_key)],
+    default_response_class=ORJSONResponse
+)
+
+
+# Static body, serialized once at import
+_MESSAGE_INFO_BODY = orjson.dumps({
+    "status": "operational",
+    "endpoint": "/honeypot/message",
+    "method": "POST",
+    "required_headers": {"x-api-key": "your-api-key"},
+    "example_body": {
+        "conversation_id": "test-123",
+        "message": "Your message here"
+    }
+})
 
 
 @router.get("/message")
 async def get_message_info():
     """GET endpoint for testing - returns basic service info"""
-    return {
-        "status": "operational",
-        "endpoint": "/honeypot/message",
-        "method": "POST",
-        "required_headers": {"x-api-key": "your-api-key"},
-        "example_body": {
-            "conversation_id": "test-123",
-            "message": "Your message here"
-        }
-    }
+    # A fresh Response per request - middleware mutates response headers
+    return Response(content=_MESSAGE_INFO_BODY, media_type="application/json")
+
+
+# Returned (never stored) for conversations with nothing extracted yet
+_EMPTY_INTELLIGENCE = Intelligence()
+
+# Detection result for messages the benign prefilter clears
+_BENIGN_RESULT = ScamDetectionResult(is_scam=False, confidence=0.1)
+
+
+def _reusable_intelligence(
+    extractor,
+    conversation: ConversationHistory,
+    message: str,
+    scam_detected: bool
+) -> Optional[Intelligence]:
+    """
+    Get the intelligence for this turn without extracting, if possible
+    
+    Extraction is skipped until the conversation is a scam, and on non-scam
+    turns that cannot contain new entities.
+    
+    Returns:
+        Intelligence to respond with, or None if extraction is needed
+    """
+    previous_intelligence = conversation.intelligence
+    if not scam_detected and not conversation.agent_state.scam_confirmed:
+        return previous_intelligence or _EMPTY_INTELLIGENCE
+    if (
+        not scam_detected
+        and previous_intelligence is not None
+        and not extractor.has_entity_hints(message)
+    ):
+        return previous_intelligence
+    return None
+
+
+async def _persist_intelligence(
+    memory,
+    conversation: ConversationHistory,
+    extraction: "asyncio.Task[Intelligence]",
+    covered_turns: int
+) -> Intelligence:
+    """
+    Wait for an extraction and persist its result if changed
+    
+    A result is only recorded if no extraction covering more turns has
+    been recorded since this one started.
+    """
+    intelligence = await extraction
+    if covered_turns <= conversation.intelligence_turns:
+        return intelligence
+    
+    changed = intelligence != conversation.intelligence
+    conversation.intelligence = intelligence
+    conversation.intelligence_turns = covered_turns
+    if changed:
+        await memory.update_intelligence(conversation.conversation_id, intelligence, covered_turns)
+    return intelligence
+
+
+async def _stream_response(
+    scam_detected: bool,
+    reply: str,
+    engagement_metrics: EngagementMetrics,
+    intelligence: Optional[Intelligence],
+    intelligence_task: Optional["asyncio.Task[Intelligence]"]
+) -> AsyncIterator[bytes]:
+    """Yield the reply first, then metrics and intelligence once extracted"""
+    yield orjson.dumps({"scam_detected": scam_detected, "reply": reply}) + b"\n"
+    
+    if intelligence_task is not None:
+        try:
+            intelligence = await intelligence_task
+        except Exception as e:
+            # Headers are already sent, so degrade to empty intelligence
+            logger.error(f"Extraction failed after reply was streamed: {e}", exc_info=True)
+            intelligence = _EMPTY_INTELLIGENCE
+    
+    yield orjson.dumps({
+        "engagement_metrics": engagement_metrics.model_dump(),
+        "intelligence": intelligence.model_dump()
+    }) + b"\n"
+
+
+def _parse_message_request(body: bytes) -> MessageRequest:
+    """Parse the request body, falling back to the defaults on empty or malformed input"""
+    if not body:
+        return MessageRequest()
+    try:
+        return MessageRequest.model_validate(orjson.loads(body))
+    except (orjson.JSONDecodeError, ValidationError) as e:
+        logger.warning(f"Could not parse request body, using defaults: {e}")
+        return MessageRequest()
 
 
-@router.post("/message", response_model=MessageResponse)
-async def process_message(request: Request) -> MessageResponse:
+# The schema is documented via responses= rather than response_model so
+# FastAPI does not re-validate and re-encode the body it is handed. The body
+# is parsed by hand so malformed input falls back to the defaults instead of
+# a 422, and is documented via openapi_extra
+@router.post(
+    "/message",
+    responses={200: {"model": MessageResponse}},
+    openapi_extra={"requestBody": {"content": {"application/json": {
+        "schema": MessageRequest.model_json_schema()
+    }}}}
+)
+async def process_message(
+    request: Request,
+    accept: Optional[str] = Header(default=None)
+):
     """
     Process an incoming scam conversation message.
     
@@ -52,126 +172,172 @@ async def process_message(request: Request) -> MessageResponse:
     3. Engage with honeypot agent if scam
     4. Extract intelligence
     5. Return structured response
+    
+    Clients sending `Accept: application/x-ndjson` get the reply as the first
+    line of the body, followed by metrics and intelligence once extraction
+    finishes.
     """
-    # Parse request body - handle empty or malformed bodies gracefully
-    conversation_id = "default-test-conversation"
-    message = "Hello, this is a test message."
+    payload = _parse_message_request(await request.body())
     
-    try:
-        body = await request.body()
-        if body:
-            body_json = json.loads(body)
-            conversation_id = str(body_json.get("conversation_id", conversation_id))
-            message = str(body_json.get("message", message))
-    except (json.JSONDecodeError, Exception) as e:
-        logger.warning(f"Could not parse request body, using defaults: {e}")
+    conversation_id = payload.conversation_id
+    message = payload.message
     
-    # Ensure values are strings
-    conversation_id = str(conversation_id) if conversation_id else "default-test-conversation"
-    message = str(message) if message else "Hello, this is a test message."
+    logger.debug("Processing message for conversation: %s", conversation_id)
     
-    logger.info(f"Processing message for conversation: {conversation_id}")
+    # Single clock read shared by every timestamp this request creates
+    now = utc_now()
     
     try:
-        # Get services
-        memory = await get_memory_store()
-        detection = get_detection_service()
-        extractor = get_extractor_service()
-        metrics_service = get_metrics_service()
-        agent = get_honeypot_agent()
+        # Services are resolved once at startup (see lifespan)
+        services = request.app.state
+        memory = services.memory
+        detection = services.detection
+        extractor = services.extractor
+        metrics_service = services.metrics
+        agent = services.agent
         
-        # Load conversation history
-        conversation = await memory.get_conversation(conversation_id)
+        # Load conversation history. A detector that only looks at the
+        # message can run while the conversation is being fetched
+        benign = detection.is_obviously_benign(message)
+        detection_result = None
+        if detection.uses_history or benign:
+            conversation = await memory.get_conversation(conversation_id)
+        else:
+            conversation, detection_result = await asyncio.gather(
+                memory.get_conversation(conversation_id),
+                detection.detect(message)
+            )
         if not conversation:
-            conversation = ConversationHistory(
+            # Built from validated values, so validation is skipped
+            conversation = ConversationHistory.model_construct(
                 conversation_id=conversation_id,
                 turns=[],
-                agent_state=AgentState(),
-                started_at=datetime.utcnow()
+                agent_state=AgentState.model_construct(),
+                started_at=now,
+                last_updated=now
             )
         
         # Prepare history for services
-        history_dicts = [
-            {"role": t.role, "content": t.content}
-            for t in conversation.turns
-        ]
+        history_dicts = conversation.history_dicts
         
-        # Run scam detection
-        detection_result = await detection.detect(message, history_dicts)
-        scam_detected = detection_result.is_scam
-        
-        logger.info(f"Scam detected: {scam_detected} (confidence: {detection_result.confidence})")
-        
-        # Add incoming message to history
-        user_turn = ConversationTurn(
+        # Turns are built from already-validated values, so validation is
+        # skipped. They are kept locally and persisted together with the
+        # agent state in a single write once the reply exists
+        user_turn = ConversationTurn.model_construct(
             role="user",
             content=message,
-            timestamp=datetime.utcnow()
+            timestamp=now
         )
-        await memory.append_turn(conversation_id, user_turn)
+        if detection_result is None:
+            if benign and not conversation.agent_state.scam_confirmed:
+                # Short chaff with no scam hints - skip detection entirely
+                detection_result = _BENIGN_RESULT
+            else:
+                detection_result = await detection.detect(message, history_dicts)
+        scam_detected = detection_result.is_scam
         
-        # Update history for agent
-        history_dicts.append({"role": "user", "content": message})
+        logger.debug("Scam detected: %s (confidence: %s)", scam_detected, detection_result.confidence)
+        
+        # The local conversation is kept in step with the store so it
+        # never needs to be refetched
+        conversation.add_turn(user_turn)
+        
+        # Extract intelligence, unless the previous result still stands.
+        # Extraction runs alongside reply generation rather than after it;
+        # the reply is ours and carries no entities to extract. Only the
+        # turns after those the stored intelligence covers need scanning on
+        # top of it, which includes any whose extraction was still running
+        intelligence = _reusable_intelligence(extractor, conversation, message, scam_detected)
+        extraction = None
+        if intelligence is None:
+            covered_turns = len(conversation.turns)
+            extraction = asyncio.create_task(
+                extractor.extract(
+                    list(conversation.history_dicts),
+                    conversation.intelligence,
+                    conversation.intelligence_turns
+                )
+            )
         
         # Generate reply
         if scam_detected:
-            # Select strategy
-            strategy = await agent.select_strategy(conversation, conversation.agent_state)
+            # Select strategy and generate honeypot reply in one call
+            decision = await agent.decide_and_reply(
+                message=message,
+                conversation=conversation,
+                conversation_history=history_dicts[:-1],  # Exclude current
+                agent_state=conversation.agent_state
+            )
+            reply = decision.reply
             
             # Update agent state
             new_state = agent.update_agent_state(
                 conversation.agent_state,
-                strategy,
+                decision.strategy,
                 scam_detected
             )
-            await memory.update_agent_state(conversation_id, new_state)
-            
-            # Generate honeypot reply
-            reply = await agent.generate_reply(
-                message=message,
-                conversation_history=history_dicts[:-1],  # Exclude current
-                strategy=strategy.strategy,
-                agent_state=new_state
-            )
+            conversation.agent_state = new_state
         else:
+            new_state = None
             reply = agent.generate_neutral_reply(message)
         
         # Add reply to history
-        assistant_turn = ConversationTurn(
+        assistant_turn = ConversationTurn.model_construct(
             role="assistant",
             content=reply,
-            timestamp=datetime.utcnow()
+            timestamp=now
         )
-        await memory.append_turn(conversation_id, assistant_turn)
+        conversation.add_turn(assistant_turn)
         
-        # Get updated conversation for metrics
-        conversation = await memory.get_conversation(conversation_id)
+        saved = await memory.append_turns_and_state(
+            conversation_id,
+            [user_turn, assistant_turn],
+            new_state
+        )
+        if not saved:
+            logger.warning(f"Failed to persist conversation {conversation_id}; response uses local state")
         
-        # Extract intelligence
-        full_history = [
-            {"role": t.role, "content": t.content}
-            for t in conversation.turns
-        ]
-        intelligence = await extractor.extract(full_history)
+        # Persisted once the turns are written, so a new conversation exists
+        intelligence_task = None
+        if extraction is not None:
+            intelligence_task = asyncio.create_task(
+                _persist_intelligence(memory, conversation, extraction, covered_turns)
+            )
         
-        # Calculate metrics
+        # Calculate metrics while extraction is in flight. This is O(1) - a
+        # turn count and one timestamp delta - so it runs inline; handing it
+        # to a worker thread would cost more than the calculation itself
         engagement_metrics = metrics_service.calculate_metrics(conversation)
         
-        response = MessageResponse(
-            scam_detected=scam_detected,
-            engagement_metrics=engagement_metrics,
-            intelligence=intelligence,
-            reply=reply
-        )
+        if accept and NDJSON_MEDIA_TYPE in accept:
+            return StreamingResponse(
+                _stream_response(
+                    scam_detected, reply, engagement_metrics, intelligence, intelligence_task
+                ),
+                media_type=NDJSON_MEDIA_TYPE
+            )
         
-        logger.info(
-            f"Response: scam={scam_detected}, "
-            f"turns={engagement_metrics.turns}, "
-            f"entities={metrics_service.calculate_entity_count(intelligence)}"
-        )
+        if intelligence_task is not None:
+            intelligence = await intelligence_task
         
-        return response
+        # Deferred formatting, and the entity count is only computed if
+        # the line is actually emitted
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                "Response: scam=%s, turns=%s, entities=%s",
+                scam_detected,
+                engagement_metrics.turns,
+                metrics_service.calculate_entity_count(intelligence)
+            )
         
+        # Same shape as MessageResponse, built from already-validated parts
+        return ORJSONResponse({
+            "scam_detected": scam_detected,
+            "engagement_metrics": engagement_metrics.model_dump(),
+            "intelligence": intelligence.model_dump(),
+            "reply": reply
+        })
+    
     except Exception as e:
         logger.error(f"Error processing message: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
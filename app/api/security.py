@@ -0,0 +1,49 @@
+"""
+API key authentication dependency
+"""
+
+import logging
+from typing import Optional
+
+from fastapi import HTTPException, Request, Security
+from fastapi.security import APIKeyHeader
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# auto_error is off so missing and invalid keys keep their own messages
+api_key_header = APIKeyHeader(name="x-api-key", auto_error=False)
+
+# Settings are fixed for the life of the process, so the keys are read once
+# rather than on every request. The missing-keys warning is logged at
+# startup, once logging is configured
+_VALID_KEYS = get_settings().api_keys_set
+
+
+async def require_api_key(
+    request: Request,
+    api_key: Optional[str] = Security(api_key_header)
+) -> str:
+    """
+    Validate the x-api-key header
+    
+    Only runs on routes that declare it, so unauthenticated endpoints skip
+    the check entirely.
+    
+    Returns:
+        The validated API key
+    """
+    if not api_key:
+        logger.warning(f"Missing API key for {request.url.path}")
+        raise HTTPException(
+            status_code=401,
+            detail="Missing API key. Provide x-api-key header."
+        )
+    
+    # If no keys configured, allow all (development mode)
+    if _VALID_KEYS and api_key not in _VALID_KEYS:
+        logger.warning(f"Invalid API key attempt for {request.url.path}")
+        raise HTTPException(status_code=403, detail="Invalid API key")
+    
+    return api_key
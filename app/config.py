@@ -2,8 +2,8 @@
 Application configuration using Pydantic Settings
 """
 
-from functools import lru_cache
-from typing import List
+from functools import cached_property, lru_cache
+from typing import FrozenSet, List, Literal
 from pydantic_settings import BaseSettings
 from pydantic import Field
 
@@ -14,6 +14,11 @@ class Settings(BaseSettings):
     # Redis Configuration
     redis_url: str = Field(default="redis://localhost:6379/0", env="REDIS_URL")
     redis_password: str | None = Field(default=None, env="REDIS_PASSWORD")
+    redis_pool_size: int = Field(default=64, env="REDIS_POOL_SIZE")
+    redis_timeout: float = Field(default=5.0, env="REDIS_TIMEOUT")
+    redis_connect_timeout: float = Field(default=0.5, env="REDIS_CONNECT_TIMEOUT")
+    # Window for writing concurrent appends in one transaction (0 disables)
+    redis_write_batch_window_ms: int = Field(default=0, env="REDIS_WRITE_BATCH_WINDOW_MS")
     
     # API Security
     api_keys: str = Field(default="", env="API_KEYS")
@@ -21,17 +26,43 @@ class Settings(BaseSettings):
     # Application Settings
     log_level: str = Field(default="INFO", env="LOG_LEVEL")
     debug: bool = Field(default=False, env="DEBUG")
+    # Comma-separated browser origins allowed via CORS (empty disables CORS)
+    cors_origins: str = Field(default="*", env="CORS_ORIGINS")
+    
+    # LLM Settings (optional OpenAI-compatible backend; heuristic-only if no key)
+    llm_api_key: str | None = Field(default=None, env="LLM_API_KEY")
+    llm_base_url: str = Field(default="https://api.openai.com/v1", env="LLM_BASE_URL")
+    llm_model: str = Field(default="gpt-4o-mini", env="LLM_MODEL")
+    # Micro-batching of concurrent LLM calls
+    llm_batch_size: int = Field(default=16, env="LLM_BATCH_SIZE")
+    llm_batch_wait_ms: int = Field(default=10, env="LLM_BATCH_WAIT_MS")
+    llm_max_parallel: int = Field(default=64, env="LLM_MAX_PARALLEL")
+    # Window for coalescing concurrent extractions into one LLM call (0 disables)
+    extraction_batch_window_ms: int = Field(default=0, env="EXTRACTION_BATCH_WINDOW_MS")
+    # Heuristic confidence at or beyond which detection skips the LLM. Every
+    # message without scam keywords scores 0.1, so the lower bound is off by
+    # default to keep those messages going to the LLM
+    detection_skip_llm_above: float = Field(default=0.85, env="DETECTION_SKIP_LLM_ABOVE")
+    detection_skip_llm_below: float = Field(default=0.0, env="DETECTION_SKIP_LLM_BELOW")
     
     # Memory Settings
     memory_ttl_seconds: int = Field(default=86400, env="MEMORY_TTL_SECONDS")
     use_redis_fallback: bool = Field(default=True, env="USE_REDIS_FALLBACK")
+    # Encoding of values stored in Redis; JSON stays readable with redis-cli
+    serialization_format: Literal["json", "msgpack"] = Field(default="json", env="SERIALIZATION_FORMAT")
+    # In-process cache of recently used conversations
+    local_cache_size: int = Field(default=10_000, env="LOCAL_CACHE_SIZE")
+    local_cache_ttl: float = Field(default=30.0, env="LOCAL_CACHE_TTL")
+    
+    @cached_property
+    def api_keys_set(self) -> FrozenSet[str]:
+        """Parse comma-separated API keys once into a set for membership checks"""
+        return frozenset(key.strip() for key in self.api_keys.split(",") if key.strip())
     
     @property
-    def api_keys_list(self) -> List[str]:
-        """Parse comma-separated API keys into list"""
-        if not self.api_keys:
-            return []
-        return [key.strip() for key in self.api_keys.split(",") if key.strip()]
+    def cors_origins_list(self) -> List[str]:
+        """Parse comma-separated CORS origins into list"""
+        return [origin.strip() for origin in self.cors_origins.split(",") if origin.strip()]
     
     class Config:
         env_file = ".env"
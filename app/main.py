@@ -2,26 +2,45 @@
 FastAPI Application Entry Point
 """
 
+import atexit
 import logging
+import queue
 import sys
 from contextlib import asynccontextmanager
+from logging.handlers import QueueHandler, QueueListener
 
+import orjson
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, Response
 
 from app.config import get_settings
-from app.api import router, APIKeyMiddleware
-from app.memory import get_memory_store
+from app.api import router
 
 # Configure logging
 def setup_logging():
     settings = get_settings()
     level = getattr(logging, settings.log_level.upper(), logging.INFO)
     
+    # Handlers only enqueue records; a listener thread does the stdout
+    # writes so request handlers never block on log I/O
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(
+        logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    )
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    
+    # The queue side must only render the message; the listener's handler
+    # adds the timestamp/level prefix
+    queue_handler = QueueHandler(log_queue)
+    queue_handler.setFormatter(logging.Formatter("%(message)s"))
+    
     logging.basicConfig(
         level=level,
-        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-        handlers=[logging.StreamHandler(sys.stdout)]
+        handlers=[queue_handler]
     )
     
     # Reduce noise from external libraries
@@ -35,6 +54,17 @@ logger = logging.getLogger(__name__)
 async def lifespan(app: FastAPI):
     """Application lifespan handler"""
     logger.info("Starting Honeypot AI application...")
+    if not get_settings().api_keys_set:
+        logger.warning("No API keys configured - allowing all requests")
+    
+    # Service modules (and the LLM client they pull in) load here rather
+    # than at import, keeping the app module itself cheap to import
+    from app.memory import get_memory_store
+    from app.services.detection import get_detection_service
+    from app.services.extractor import get_extractor_service
+    from app.services.metrics import get_metrics_service
+    from app.services.llm import get_llm_service
+    from app.agents import get_honeypot_agent
     
     # Initialize memory store on startup
     memory = await get_memory_store()
@@ -43,11 +73,20 @@ async def lifespan(app: FastAPI):
     else:
         logger.warning("Memory store health check failed")
     
+    # Resolve services once so request handlers read them from app.state
+    app.state.memory = memory
+    app.state.detection = get_detection_service()
+    app.state.extractor = get_extractor_service()
+    app.state.metrics = get_metrics_service()
+    app.state.agent = get_honeypot_agent()
+    
     yield
     
     # Cleanup on shutdown
     logger.info("Shutting down Honeypot AI application...")
     await memory.close()
+    await app.state.extractor.close()
+    await get_llm_service().close()
 
 
 # Create FastAPI application
@@ -55,38 +94,46 @@ app = FastAPI(
     title="Agentic Honey-Pot API",
     description="Scam Detection & Intelligence Extraction System",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
-# Add middleware
-app.add_middleware(APIKeyMiddleware)
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# Add middleware (API key auth is a dependency on the honeypot router).
+# CORS only matters for browser clients, so it can be switched off for
+# server-to-server deployments
+cors_origins = get_settings().cors_origins_list
+if cors_origins:
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=cors_origins,
+        allow_credentials=True,
+        allow_methods=["GET", "POST"],
+        allow_headers=["x-api-key", "content-type", "accept"],
+    )
 
 # Include routers
 app.include_router(router)
 
 
+# Static body, serialized once at import
+_ROOT_BODY = orjson.dumps({
+    "service": "Agentic Honey-Pot API",
+    "version": "1.0.0",
+    "status": "operational"
+})
+
+
 @app.get("/")
 async def root():
     """Root endpoint"""
-    return {
-        "service": "Agentic Honey-Pot API",
-        "version": "1.0.0",
-        "status": "operational"
-    }
+    # A fresh Response per request - middleware mutates response headers
+    return Response(content=_ROOT_BODY, media_type="application/json")
 
 
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    memory = await get_memory_store()
-    memory_healthy = await memory.health_check()
+    memory_healthy = await app.state.memory.health_check()
     
     return {
         "status": "healthy" if memory_healthy else "degraded",
@@ -96,4 +143,12 @@ async def health_check():
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
+    # uvloop (from uvicorn[standard]) does not support Windows
+    uvicorn.run(
+        "app.main:app",
+        host="0.0.0.0",
+        port=8000,
+        reload=True,
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        http="httptools"
+    )
@@ -2,20 +2,33 @@
 Memory store implementation with Redis primary and in-memory fallback
 """
 
-import json
+import asyncio
 import logging
-from datetime import datetime
-from typing import Optional, Dict, Any
+import time
+from collections import deque
+from typing import Optional, Deque, Dict, Any, List, Tuple, Type, TypeVar
 from abc import ABC, abstractmethod
 
+import ormsgpack
+import pydantic_core
 import redis.asyncio as redis
+from cachetools import TTLCache
+from pydantic import BaseModel, TypeAdapter
+from redis.asyncio.retry import Retry
+from redis.backoff import ExponentialBackoff
 from redis.exceptions import ConnectionError, TimeoutError
 
 from app.config import get_settings
-from app.models import ConversationHistory, ConversationTurn, AgentState
+from app.models import ConversationHistory, ConversationTurn, AgentState, Intelligence
+from app.models.schemas import utc_now
 
 logger = logging.getLogger(__name__)
 
+# Reads conversations stored as a single JSON value by older versions
+_CONVERSATION_ADAPTER = TypeAdapter(ConversationHistory)
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
 
 class BaseMemoryStore(ABC):
     """Abstract base class for memory stores"""
@@ -40,30 +53,78 @@ class BaseMemoryStore(ABC):
         """Update agent state for conversation"""
         pass
     
+    @abstractmethod
+    async def append_turns_and_state(
+        self,
+        conversation_id: str,
+        turns: List[ConversationTurn],
+        state: Optional[AgentState] = None
+    ) -> bool:
+        """Append turns and optionally update agent state in one write"""
+        pass
+    
+    @abstractmethod
+    async def update_intelligence(
+        self,
+        conversation_id: str,
+        intelligence: Intelligence,
+        covered_turns: int = 0
+    ) -> bool:
+        """
+        Update extracted intelligence for conversation
+        
+        Args:
+            conversation_id: Conversation the intelligence belongs to
+            intelligence: Extracted intelligence
+            covered_turns: Number of leading turns it was extracted from
+        """
+        pass
+    
     @abstractmethod
     async def health_check(self) -> bool:
         """Check if store is healthy"""
         pass
+    
+    async def close(self) -> None:
+        """Release background resources; nothing to do by default"""
 
 
 class InMemoryStore(BaseMemoryStore):
-    """In-memory fallback store"""
+    """
+    In-memory fallback store.
+    
+    Conversations are kept as model objects, so nothing is serialized or
+    validated. Each caller gets its own copy of the conversation and its
+    turns list; the turn, state and intelligence objects are shared, as
+    they are replaced rather than mutated.
+    """
     
     def __init__(self):
-        self._store: Dict[str, Dict[str, Any]] = {}
+        self._store: Dict[str, ConversationHistory] = {}
         logger.info("Initialized in-memory store")
     
+    @staticmethod
+    def _copy(conversation: ConversationHistory) -> ConversationHistory:
+        """Copy a conversation so appends to one side don't reach the other"""
+        copy = ConversationHistory.model_construct(
+            **{**dict(conversation), "turns": list(conversation.turns)}
+        )
+        # Carry the already-built history over so the copy needn't rebuild it
+        if conversation._history_dicts is not None:
+            copy._history_dicts = list(conversation._history_dicts)
+        return copy
+    
     async def get_conversation(self, conversation_id: str) -> Optional[ConversationHistory]:
         """Retrieve conversation from memory"""
-        data = self._store.get(conversation_id)
-        if not data:
+        conversation = self._store.get(conversation_id)
+        if conversation is None:
             return None
-        return ConversationHistory(**data)
+        return self._copy(conversation)
     
     async def save_conversation(self, conversation: ConversationHistory) -> bool:
         """Save conversation to memory"""
         try:
-            self._store[conversation.conversation_id] = conversation.model_dump(mode="json")
+            self._store[conversation.conversation_id] = self._copy(conversation)
             return True
         except Exception as e:
             logger.error(f"Failed to save conversation: {e}")
@@ -71,33 +132,68 @@ class InMemoryStore(BaseMemoryStore):
     
     async def append_turn(self, conversation_id: str, turn: ConversationTurn) -> bool:
         """Append turn to conversation"""
+        return await self.append_turns_and_state(conversation_id, [turn])
+    
+    async def update_agent_state(self, conversation_id: str, state: AgentState) -> bool:
+        """Update agent state"""
+        conversation = self._store.get(conversation_id)
+        if conversation is None:
+            return False
+        conversation.agent_state = state
+        conversation.last_updated = utc_now()
+        return True
+    
+    async def append_turns_and_state(
+        self,
+        conversation_id: str,
+        turns: List[ConversationTurn],
+        state: Optional[AgentState] = None
+    ) -> bool:
+        """Append turns and optionally update agent state"""
         try:
-            if conversation_id not in self._store:
-                # Create new conversation
+            conversation = self._store.get(conversation_id)
+            if conversation is None:
+                # Timestamps come from the turns, as in the Redis store, so
+                # durations agree across backends
+                timestamps = {}
+                if turns:
+                    timestamps = {
+                        "started_at": turns[0].timestamp,
+                        "last_updated": turns[-1].timestamp,
+                    }
                 conversation = ConversationHistory(
                     conversation_id=conversation_id,
-                    turns=[turn]
+                    turns=list(turns),
+                    agent_state=state or AgentState(),
+                    **timestamps
                 )
                 return await self.save_conversation(conversation)
             
-            self._store[conversation_id]["turns"].append(turn.model_dump(mode="json"))
-            self._store[conversation_id]["last_updated"] = datetime.utcnow().isoformat()
+            for turn in turns:
+                conversation.add_turn(turn)
+            if state is not None:
+                conversation.agent_state = state
+            if not turns:
+                conversation.last_updated = utc_now()
             return True
         except Exception as e:
-            logger.error(f"Failed to append turn: {e}")
+            logger.error(f"Failed to append turns: {e}")
             return False
     
-    async def update_agent_state(self, conversation_id: str, state: AgentState) -> bool:
-        """Update agent state"""
-        try:
-            if conversation_id not in self._store:
-                return False
-            self._store[conversation_id]["agent_state"] = state.model_dump(mode="json")
-            self._store[conversation_id]["last_updated"] = datetime.utcnow().isoformat()
-            return True
-        except Exception as e:
-            logger.error(f"Failed to update agent state: {e}")
+    async def update_intelligence(
+        self,
+        conversation_id: str,
+        intelligence: Intelligence,
+        covered_turns: int = 0
+    ) -> bool:
+        """Update extracted intelligence"""
+        conversation = self._store.get(conversation_id)
+        if conversation is None:
             return False
+        conversation.intelligence = intelligence
+        conversation.intelligence_turns = covered_turns
+        conversation.last_updated = utc_now()
+        return True
     
     async def health_check(self) -> bool:
         """In-memory store is always healthy"""
@@ -105,44 +201,208 @@ class InMemoryStore(BaseMemoryStore):
 
 
 class RedisMemoryStore(BaseMemoryStore):
-    """Redis-based memory store"""
+    """
+    Redis-based memory store.
+    
+    Each conversation is spread over two keys so that every write only
+    moves what changed over the wire:
+    - ``...:turns`` LIST of turn JSON, one element per turn
+    - ``...:meta`` HASH with started_at / last_updated, plus the
+      agent_state and intelligence JSON as fields and the number of turns
+      the intelligence covers
+    
+    Values are JSON or MessagePack depending on ``serialization_format``.
+    Reads detect the format of each value, so switching the setting never
+    strands data written under the other one.
+    
+    Conversations written by older versions as a single JSON value are
+    migrated to this layout the first time they are read.
+    """
     
-    def __init__(self, redis_client: redis.Redis, ttl: int = 86400):
+    KEY_PREFIX = "honeypot:v2:conversation"
+    LEGACY_KEY_PREFIX = "honeypot:conversation"
+    
+    # Circuit breaker: after BREAKER_FAIL_MAX connection failures within
+    # BREAKER_WINDOW_SECONDS, calls skip Redis and go straight to the
+    # fallback for BREAKER_RESET_SECONDS instead of each waiting on a timeout
+    BREAKER_FAIL_MAX = 5
+    BREAKER_WINDOW_SECONDS = 10
+    BREAKER_RESET_SECONDS = 30
+    
+    # Most appends flushed together when write batching is enabled
+    WRITE_BATCH_MAX = 64
+    
+    def __init__(
+        self,
+        redis_client: redis.Redis,
+        ttl: int = 86400,
+        serialization_format: str = "json",
+        write_batch_window_ms: int = 0
+    ):
         self._redis = redis_client
         self._ttl = ttl
+        self._msgpack = serialization_format == "msgpack"
+        self._default_state = self._dumps(AgentState())
         self._fallback = InMemoryStore()
-        logger.info("Initialized Redis memory store")
+        self._write_window = write_batch_window_ms / 1000
+        self._write_queue: Optional[asyncio.Queue] = None
+        self._write_worker: Optional[asyncio.Task] = None
+        self._write_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._failure_times: Deque[float] = deque(maxlen=self.BREAKER_FAIL_MAX)
+        self._circuit_open_until = 0.0
+        logger.info(f"Initialized Redis memory store ({serialization_format} values)")
+    
+    def _circuit_open(self) -> bool:
+        """Whether Redis is being bypassed after repeated failures"""
+        return time.monotonic() < self._circuit_open_until
+    
+    def _record_failure(self, error: Exception) -> None:
+        """Log a connection failure, opening the circuit at the limit"""
+        logger.warning(f"Redis connection error, using fallback: {error}")
+        
+        now = time.monotonic()
+        self._failure_times.append(now)
+        if (
+            len(self._failure_times) == self.BREAKER_FAIL_MAX
+            and now - self._failure_times[0] <= self.BREAKER_WINDOW_SECONDS
+        ):
+            self._circuit_open_until = now + self.BREAKER_RESET_SECONDS
+            self._failure_times.clear()
+            logger.warning(f"Redis keeps failing, bypassing it for {self.BREAKER_RESET_SECONDS}s")
+    
+    def _dumps(self, model: BaseModel) -> bytes:
+        """Serialize a model to bytes in the configured format"""
+        if self._msgpack:
+            return ormsgpack.packb(model, option=ormsgpack.OPT_SERIALIZE_PYDANTIC)
+        return pydantic_core.to_json(model)
+    
+    @staticmethod
+    def _loads(model_cls: Type[ModelT], raw: bytes) -> ModelT:
+        """Deserialize a value written in either format"""
+        # Every value is a JSON object or a MessagePack map
+        if raw[:1] == b"{":
+            return model_cls.model_validate_json(raw)
+        return model_cls.model_validate(ormsgpack.unpackb(raw))
     
-    def _key(self, conversation_id: str) -> str:
-        """Generate Redis key for conversation"""
-        return f"honeypot:conversation:{conversation_id}"
+    def _turns_key(self, conversation_id: str) -> str:
+        """List of turn JSON"""
+        return f"{self.KEY_PREFIX}:{conversation_id}:turns"
+    
+    def _meta_key(self, conversation_id: str) -> str:
+        """Hash of conversation timestamps"""
+        return f"{self.KEY_PREFIX}:{conversation_id}:meta"
+    
+    def _legacy_key(self, conversation_id: str) -> str:
+        """Key of a conversation stored as a single JSON value"""
+        return f"{self.LEGACY_KEY_PREFIX}:{conversation_id}"
+    
+    def _expire_all(self, pipe, conversation_id: str) -> None:
+        """Queue TTL refreshes so every key of a conversation expires together"""
+        pipe.expire(self._turns_key(conversation_id), self._ttl)
+        pipe.expire(self._meta_key(conversation_id), self._ttl)
+    
+    def _queue_append(
+        self,
+        pipe,
+        conversation_id: str,
+        turns: List[ConversationTurn]
+    ) -> None:
+        """Queue the commands that append turns and touch the metadata"""
+        pipe.rpush(
+            self._turns_key(conversation_id),
+            *(self._dumps(turn) for turn in turns)
+        )
+        meta_key = self._meta_key(conversation_id)
+        # started_at is only set by the first write of a conversation
+        pipe.hsetnx(meta_key, "started_at", turns[0].timestamp.isoformat())
+        pipe.hset(meta_key, "last_updated", turns[-1].timestamp.isoformat())
+    
+    async def _migrate_legacy_conversation(
+        self,
+        conversation_id: str,
+        data: bytes
+    ) -> ConversationHistory:
+        """Migrate a single-value conversation to the list layout"""
+        conversation = _CONVERSATION_ADAPTER.validate_json(data)
+        if await self.save_conversation(conversation):
+            logger.info("Migrated conversation %s to list layout", conversation_id)
+        return conversation
     
     async def get_conversation(self, conversation_id: str) -> Optional[ConversationHistory]:
         """Retrieve conversation from Redis"""
+        if self._circuit_open():
+            return await self._fallback.get_conversation(conversation_id)
+        
         try:
-            data = await self._redis.get(self._key(conversation_id))
-            if not data:
-                return None
-            return ConversationHistory(**json.loads(data))
+            # All parts come back in a single round trip. The legacy key is
+            # read alongside, so a miss costs no second round trip
+            async with self._redis.pipeline(transaction=False) as pipe:
+                pipe.hgetall(self._meta_key(conversation_id))
+                pipe.lrange(self._turns_key(conversation_id), 0, -1)
+                pipe.get(self._legacy_key(conversation_id))
+                meta, raw_turns, legacy = await pipe.execute()
+            
+            if not meta:
+                if not legacy:
+                    return None
+                return await self._migrate_legacy_conversation(conversation_id, legacy)
+            
+            turns = [self._loads(ConversationTurn, raw) for raw in raw_turns]
+            raw_state = meta.get(b"agent_state")
+            raw_intel = meta.get(b"intelligence")
+            raw_started = meta.get(b"started_at")
+            raw_updated = meta.get(b"last_updated")
+            # A state or intelligence write can create the hash before any
+            # turns are appended, leaving the timestamps unset
+            now = utc_now()
+            return ConversationHistory(
+                conversation_id=conversation_id,
+                turns=turns,
+                agent_state=self._loads(AgentState, raw_state) if raw_state else AgentState(),
+                started_at=raw_started.decode() if raw_started else (turns[0].timestamp if turns else now),
+                last_updated=raw_updated.decode() if raw_updated else (turns[-1].timestamp if turns else now),
+                intelligence=self._loads(Intelligence, raw_intel) if raw_intel else None,
+                intelligence_turns=int(meta.get(b"intelligence_turns", 0))
+            )
         except (ConnectionError, TimeoutError) as e:
-            logger.warning(f"Redis connection error, using fallback: {e}")
+            self._record_failure(e)
             return await self._fallback.get_conversation(conversation_id)
         except Exception as e:
             logger.error(f"Failed to get conversation: {e}")
             return None
     
     async def save_conversation(self, conversation: ConversationHistory) -> bool:
-        """Save conversation to Redis"""
+        """Save a whole conversation to Redis, replacing what is stored"""
+        conversation_id = conversation.conversation_id
+        if self._circuit_open():
+            return await self._fallback.save_conversation(conversation)
+        
         try:
-            data = conversation.model_dump_json()
-            await self._redis.setex(
-                self._key(conversation.conversation_id),
-                self._ttl,
-                data
-            )
+            async with self._redis.pipeline(transaction=True) as pipe:
+                pipe.delete(
+                    self._turns_key(conversation_id),
+                    self._meta_key(conversation_id),
+                    self._legacy_key(conversation_id)
+                )
+                if conversation.turns:
+                    pipe.rpush(
+                        self._turns_key(conversation_id),
+                        *(self._dumps(turn) for turn in conversation.turns)
+                    )
+                meta = {
+                    "started_at": conversation.started_at.isoformat(),
+                    "last_updated": conversation.last_updated.isoformat(),
+                    "agent_state": self._dumps(conversation.agent_state),
+                }
+                if conversation.intelligence is not None:
+                    meta["intelligence"] = self._dumps(conversation.intelligence)
+                    meta["intelligence_turns"] = conversation.intelligence_turns
+                pipe.hset(self._meta_key(conversation_id), mapping=meta)
+                self._expire_all(pipe, conversation_id)
+                await pipe.execute()
             return True
         except (ConnectionError, TimeoutError) as e:
-            logger.warning(f"Redis connection error, using fallback: {e}")
+            self._record_failure(e)
             return await self._fallback.save_conversation(conversation)
         except Exception as e:
             logger.error(f"Failed to save conversation: {e}")
@@ -150,33 +410,186 @@ class RedisMemoryStore(BaseMemoryStore):
     
     async def append_turn(self, conversation_id: str, turn: ConversationTurn) -> bool:
         """Append turn to conversation in Redis"""
+        return await self.append_turns_and_state(conversation_id, [turn])
+    
+    async def update_agent_state(self, conversation_id: str, state: AgentState) -> bool:
+        """Update agent state in Redis"""
+        if self._circuit_open():
+            return await self._fallback.update_agent_state(conversation_id, state)
+        
         try:
-            conversation = await self.get_conversation(conversation_id)
-            if not conversation:
-                conversation = ConversationHistory(
-                    conversation_id=conversation_id,
-                    turns=[]
-                )
+            if not await self._redis.exists(self._meta_key(conversation_id)):
+                return False
             
-            conversation.turns.append(turn)
-            conversation.last_updated = datetime.utcnow()
-            return await self.save_conversation(conversation)
+            async with self._redis.pipeline(transaction=True) as pipe:
+                pipe.hset(self._meta_key(conversation_id), mapping={
+                    "agent_state": self._dumps(state),
+                    "last_updated": utc_now().isoformat(),
+                })
+                self._expire_all(pipe, conversation_id)
+                await pipe.execute()
+            return True
+        except (ConnectionError, TimeoutError) as e:
+            self._record_failure(e)
+            return await self._fallback.update_agent_state(conversation_id, state)
         except Exception as e:
-            logger.error(f"Failed to append turn: {e}")
+            logger.error(f"Failed to update agent state: {e}")
             return False
     
-    async def update_agent_state(self, conversation_id: str, state: AgentState) -> bool:
-        """Update agent state in Redis"""
+    async def append_turns_and_state(
+        self,
+        conversation_id: str,
+        turns: List[ConversationTurn],
+        state: Optional[AgentState] = None
+    ) -> bool:
+        """
+        Append turns and optionally update agent state in one transaction
+        
+        With write batching enabled, appends from concurrent requests are
+        held for up to the batch window and written in one transaction.
+        Callers still wait for that write, so durability is unchanged.
+        """
+        if not turns and state is None:
+            return True
+        
+        if self._circuit_open():
+            return await self._fallback.append_turns_and_state(conversation_id, turns, state)
+        
+        if self._write_window > 0:
+            future = asyncio.get_running_loop().create_future()
+            self._get_write_queue().put_nowait((conversation_id, turns, state, future))
+            return await future
+        
+        results = await self._write_appends([(conversation_id, turns, state)])
+        return results[0]
+    
+    async def _write_appends(
+        self,
+        appends: List[Tuple[str, List[ConversationTurn], Optional[AgentState]]]
+    ) -> List[bool]:
+        """
+        Write appends in a single transaction
+        
+        Args:
+            appends: (conversation_id, turns, state) items, in arrival order
+        
+        Returns:
+            Whether each append was stored
+        """
+        # Appends to one conversation collapse into one RPUSH and the
+        # latest state
+        merged: Dict[str, Tuple[List[ConversationTurn], Optional[AgentState]]] = {}
+        for conversation_id, turns, state in appends:
+            pending_turns, pending_state = merged.get(conversation_id, ([], None))
+            merged[conversation_id] = (
+                pending_turns + turns,
+                state if state is not None else pending_state
+            )
+        
         try:
-            conversation = await self.get_conversation(conversation_id)
-            if not conversation:
+            async with self._redis.pipeline(transaction=True) as pipe:
+                for conversation_id, (turns, state) in merged.items():
+                    if turns:
+                        self._queue_append(pipe, conversation_id, turns)
+                    if state is not None:
+                        pipe.hset(self._meta_key(conversation_id), "agent_state", self._dumps(state))
+                    else:
+                        # The first write of a conversation always stores a
+                        # state, so reads never need to look elsewhere
+                        pipe.hsetnx(self._meta_key(conversation_id), "agent_state", self._default_state)
+                    self._expire_all(pipe, conversation_id)
+                await pipe.execute()
+            return [True] * len(appends)
+        except (ConnectionError, TimeoutError) as e:
+            self._record_failure(e)
+            return [
+                await self._fallback.append_turns_and_state(conversation_id, turns, state)
+                for conversation_id, turns, state in appends
+            ]
+        except Exception as e:
+            logger.error(f"Failed to append turns: {e}")
+            return [False] * len(appends)
+    
+    def _get_write_queue(self) -> asyncio.Queue:
+        """Get the append queue, starting its worker if needed"""
+        loop = asyncio.get_running_loop()
+        # The worker is bound to the loop it was started on
+        if self._write_loop is not loop or self._write_worker.done():
+            self._write_queue = asyncio.Queue()
+            self._write_worker = loop.create_task(self._write_batches(self._write_queue))
+            self._write_loop = loop
+        return self._write_queue
+    
+    async def _write_batches(self, queue: asyncio.Queue) -> None:
+        """Drain the append queue in batches of up to WRITE_BATCH_MAX or the window"""
+        loop = asyncio.get_running_loop()
+        closing = False
+        while not closing:
+            item = await queue.get()
+            if item is None:
+                return
+            
+            batch = [item]
+            deadline = loop.time() + self._write_window
+            while len(batch) < self.WRITE_BATCH_MAX:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    # Flush what was collected, then stop
+                    closing = True
+                    break
+                batch.append(item)
+            
+            logger.debug("Writing batch of %d appends", len(batch))
+            results = await self._write_appends([appended[:3] for appended in batch])
+            for (*_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+    
+    async def close(self) -> None:
+        """Flush queued appends and stop the batch worker"""
+        if (
+            self._write_worker is None
+            or self._write_worker.done()
+            or self._write_loop is not asyncio.get_running_loop()
+        ):
+            return
+        self._write_queue.put_nowait(None)
+        await self._write_worker
+    
+    async def update_intelligence(
+        self,
+        conversation_id: str,
+        intelligence: Intelligence,
+        covered_turns: int = 0
+    ) -> bool:
+        """Update extracted intelligence in Redis"""
+        if self._circuit_open():
+            return await self._fallback.update_intelligence(conversation_id, intelligence, covered_turns)
+        
+        try:
+            if not await self._redis.exists(self._meta_key(conversation_id)):
                 return False
             
-            conversation.agent_state = state
-            conversation.last_updated = datetime.utcnow()
-            return await self.save_conversation(conversation)
+            async with self._redis.pipeline(transaction=True) as pipe:
+                pipe.hset(self._meta_key(conversation_id), mapping={
+                    "intelligence": self._dumps(intelligence),
+                    "intelligence_turns": covered_turns,
+                    "last_updated": utc_now().isoformat(),
+                })
+                self._expire_all(pipe, conversation_id)
+                await pipe.execute()
+            return True
+        except (ConnectionError, TimeoutError) as e:
+            self._record_failure(e)
+            return await self._fallback.update_intelligence(conversation_id, intelligence, covered_turns)
         except Exception as e:
-            logger.error(f"Failed to update agent state: {e}")
+            logger.error(f"Failed to update intelligence: {e}")
             return False
     
     async def health_check(self) -> bool:
@@ -189,11 +602,34 @@ class RedisMemoryStore(BaseMemoryStore):
 
 
 class MemoryStore:
-    """Main memory store with automatic fallback"""
+    """
+    Main memory store with automatic fallback.
+    
+    Recently used conversations are cached in process, so consecutive
+    messages in a conversation skip the backend fetch and decode. Callers
+    get their own copy, so changes they make locally never reach the cache;
+    writes made through this store are applied to the cached conversation
+    once the backend accepts them, and a failed write drops it. Concurrent
+    misses for one conversation share a single backend read.
+    """
+    
+    # Seconds between liveness checks on idle pooled connections
+    REDIS_HEALTH_CHECK_INTERVAL = 30
+    
+    # Retries for transient Redis errors before falling back to memory
+    REDIS_RETRIES = 3
     
     def __init__(self):
         self._store: Optional[BaseMemoryStore] = None
         self._redis_client: Optional[redis.Redis] = None
+        
+        settings = get_settings()
+        self._cache: TTLCache = TTLCache(
+            maxsize=settings.local_cache_size,
+            ttl=settings.local_cache_ttl
+        )
+        # In-flight backend reads by conversation id
+        self._pending_reads: Dict[str, asyncio.Task] = {}
     
     async def initialize(self) -> None:
         """Initialize the memory store"""
@@ -201,17 +637,31 @@ class MemoryStore:
         
         if settings.use_redis_fallback:
             try:
-                self._redis_client = redis.from_url(
+                # One bounded pool shared by every request. It blocks (up to
+                # the timeout) when exhausted instead of raising, so bursts
+                # queue for a connection rather than hitting the fallback.
+                # Values stay as bytes and are decoded by pydantic-core
+                pool = redis.BlockingConnectionPool.from_url(
                     settings.redis_url,
                     password=settings.redis_password,
-                    encoding="utf-8",
-                    decode_responses=True
+                    max_connections=settings.redis_pool_size,
+                    timeout=settings.redis_timeout,
+                    socket_timeout=settings.redis_timeout,
+                    # Short, so an unreachable server fails fast
+                    socket_connect_timeout=settings.redis_connect_timeout,
+                    socket_keepalive=True,
+                    health_check_interval=self.REDIS_HEALTH_CHECK_INTERVAL,
+                    retry=Retry(ExponentialBackoff(), self.REDIS_RETRIES),
+                    decode_responses=False
                 )
+                self._redis_client = redis.Redis.from_pool(pool)
                 # Test connection
                 await self._redis_client.ping()
                 self._store = RedisMemoryStore(
                     self._redis_client,
-                    ttl=settings.memory_ttl_seconds
+                    ttl=settings.memory_ttl_seconds,
+                    serialization_format=settings.serialization_format,
+                    write_batch_window_ms=settings.redis_write_batch_window_ms
                 )
                 logger.info("Connected to Redis successfully")
             except Exception as e:
@@ -222,32 +672,141 @@ class MemoryStore:
     
     async def close(self) -> None:
         """Close connections"""
+        if self._store:
+            await self._store.close()
         if self._redis_client:
             await self._redis_client.close()
     
+    def _cache_turns(self, conversation_id: str, turns: List[ConversationTurn]) -> None:
+        """Mirror appended turns onto the cached conversation, if any"""
+        cached = self._cache.get(conversation_id)
+        if cached is None or not turns:
+            return
+        
+        for turn in turns:
+            cached.add_turn(turn)
+    
+    def _discard_pending_read(self, conversation_id: str) -> None:
+        """Stop an in-flight read from caching the state a write replaced"""
+        self._pending_reads.pop(conversation_id, None)
+    
+    async def _read_conversation(self, conversation_id: str) -> Optional[ConversationHistory]:
+        """Read a conversation from the backend and cache it"""
+        task = asyncio.current_task()
+        try:
+            conversation = await self._store.get_conversation(conversation_id)
+        finally:
+            current = self._pending_reads.get(conversation_id) is task
+            if current:
+                del self._pending_reads[conversation_id]
+        
+        if conversation is not None and current:
+            self._cache[conversation_id] = conversation
+        return conversation
+    
     async def get_conversation(self, conversation_id: str) -> Optional[ConversationHistory]:
         """Get conversation history"""
         if not self._store:
             await self.initialize()
-        return await self._store.get_conversation(conversation_id)
+        
+        conversation = self._cache.get(conversation_id)
+        if conversation is None:
+            # Concurrent misses wait on the same read instead of each hitting
+            # the backend; shielded so one caller's cancellation spares the rest
+            task = self._pending_reads.get(conversation_id)
+            if task is None:
+                task = asyncio.ensure_future(self._read_conversation(conversation_id))
+                self._pending_reads[conversation_id] = task
+            conversation = await asyncio.shield(task)
+            if conversation is None:
+                return None
+        return InMemoryStore._copy(conversation)
     
     async def save_conversation(self, conversation: ConversationHistory) -> bool:
         """Save conversation history"""
         if not self._store:
             await self.initialize()
-        return await self._store.save_conversation(conversation)
+        
+        saved = await self._store.save_conversation(conversation)
+        self._discard_pending_read(conversation.conversation_id)
+        if saved:
+            self._cache[conversation.conversation_id] = InMemoryStore._copy(conversation)
+        else:
+            self._cache.pop(conversation.conversation_id, None)
+        return saved
     
     async def append_turn(self, conversation_id: str, turn: ConversationTurn) -> bool:
         """Append a turn to conversation"""
         if not self._store:
             await self.initialize()
-        return await self._store.append_turn(conversation_id, turn)
+        
+        saved = await self._store.append_turn(conversation_id, turn)
+        self._discard_pending_read(conversation_id)
+        if saved:
+            self._cache_turns(conversation_id, [turn])
+        else:
+            self._cache.pop(conversation_id, None)
+        return saved
     
     async def update_agent_state(self, conversation_id: str, state: AgentState) -> bool:
         """Update agent state"""
         if not self._store:
             await self.initialize()
-        return await self._store.update_agent_state(conversation_id, state)
+        
+        saved = await self._store.update_agent_state(conversation_id, state)
+        self._discard_pending_read(conversation_id)
+        if not saved:
+            self._cache.pop(conversation_id, None)
+            return saved
+        
+        cached = self._cache.get(conversation_id)
+        if cached is not None:
+            cached.agent_state = state
+        return saved
+    
+    async def append_turns_and_state(
+        self,
+        conversation_id: str,
+        turns: List[ConversationTurn],
+        state: Optional[AgentState] = None
+    ) -> bool:
+        """Append turns and optionally update agent state in one write"""
+        if not self._store:
+            await self.initialize()
+        
+        saved = await self._store.append_turns_and_state(conversation_id, turns, state)
+        self._discard_pending_read(conversation_id)
+        if not saved:
+            self._cache.pop(conversation_id, None)
+            return saved
+        
+        self._cache_turns(conversation_id, turns)
+        cached = self._cache.get(conversation_id)
+        if cached is not None and state is not None:
+            cached.agent_state = state
+        return saved
+    
+    async def update_intelligence(
+        self,
+        conversation_id: str,
+        intelligence: Intelligence,
+        covered_turns: int = 0
+    ) -> bool:
+        """Update extracted intelligence"""
+        if not self._store:
+            await self.initialize()
+        
+        saved = await self._store.update_intelligence(conversation_id, intelligence, covered_turns)
+        self._discard_pending_read(conversation_id)
+        if not saved:
+            self._cache.pop(conversation_id, None)
+            return saved
+        
+        cached = self._cache.get(conversation_id)
+        if cached is not None:
+            cached.intelligence = intelligence
+            cached.intelligence_turns = covered_turns
+        return saved
     
     async def health_check(self) -> bool:
         """Check store health"""
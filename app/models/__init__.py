@@ -12,6 +12,7 @@ from .schemas import (
     ConversationTurn,
     ConversationHistory,
     StrategyChoice,
+    AgentDecision,
 )
 
 __all__ = [
@@ -24,4 +25,5 @@ __all__ = [
     "ConversationTurn",
     "ConversationHistory",
     "StrategyChoice",
+    "AgentDecision",
 ]
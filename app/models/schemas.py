@@ -2,15 +2,38 @@
 Pydantic schemas for all data models
 """
 
-from datetime import datetime
-from typing import List, Optional, Literal
-from pydantic import BaseModel, Field
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Literal
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr, ValidationInfo, field_validator
+
+
+def utc_now() -> datetime:
+    """Current time as a timezone-aware UTC datetime"""
+    return datetime.now(timezone.utc)
+
+
+def _as_utc(value: datetime) -> datetime:
+    """Treat naive datetimes (stored before timestamps were tz-aware) as UTC"""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
 
 
 class MessageRequest(BaseModel):
     """Incoming message request schema"""
+    # Numeric ids/messages are accepted and kept as strings
+    model_config = ConfigDict(coerce_numbers_to_str=True)
+    
     conversation_id: str = Field(default="default-test-conversation", description="Unique conversation identifier")
     message: str = Field(default="Hello, this is a test message.", description="Incoming message content")
+    
+    @field_validator("conversation_id", "message", mode="before")
+    @classmethod
+    def _default_if_blank(cls, value, info: ValidationInfo):
+        """Null or empty fields fall back to the field default"""
+        if value is None or value == "":
+            return cls.model_fields[info.field_name].default
+        return value
 
 
 class EngagementMetrics(BaseModel):
@@ -54,7 +77,9 @@ class ConversationTurn(BaseModel):
     """Single conversation turn"""
     role: Literal["user", "assistant"] = Field(..., description="Message sender role")
     content: str = Field(..., description="Message content")
-    timestamp: datetime = Field(default_factory=datetime.utcnow, description="Turn timestamp")
+    timestamp: datetime = Field(default_factory=utc_now, description="Turn timestamp")
+    
+    _normalize_timestamp = field_validator("timestamp")(_as_utc)
 
 
 class ConversationHistory(BaseModel):
@@ -62,8 +87,43 @@ class ConversationHistory(BaseModel):
     conversation_id: str = Field(..., description="Unique conversation identifier")
     turns: List[ConversationTurn] = Field(default_factory=list, description="List of conversation turns")
     agent_state: AgentState = Field(default_factory=AgentState, description="Current agent state")
-    started_at: datetime = Field(default_factory=datetime.utcnow, description="Conversation start time")
-    last_updated: datetime = Field(default_factory=datetime.utcnow, description="Last update time")
+    started_at: datetime = Field(default_factory=utc_now, description="Conversation start time")
+    last_updated: datetime = Field(default_factory=utc_now, description="Last update time")
+    intelligence: Optional[Intelligence] = Field(default=None, description="Most recently extracted intelligence")
+    intelligence_turns: int = Field(default=0, ge=0, description="Number of leading turns the intelligence was extracted from")
+    
+    _normalize_timestamps = field_validator("started_at", "last_updated")(_as_utc)
+    
+    _history_dicts: Optional[List[Dict[str, str]]] = PrivateAttr(default=None)
+    # Duration and the last_updated value it was computed for
+    _duration: Optional[int] = PrivateAttr(default=None)
+    _duration_until: Optional[datetime] = PrivateAttr(default=None)
+    
+    @property
+    def history_dicts(self) -> List[Dict[str, str]]:
+        """Turns as role/content dicts, built once and kept in sync by add_turn"""
+        if self._history_dicts is None:
+            self._history_dicts = [
+                {"role": t.role, "content": t.content}
+                for t in self.turns
+            ]
+        return self._history_dicts
+    
+    @property
+    def duration_seconds(self) -> int:
+        """Seconds from start to last update, recomputed only when last_updated changes"""
+        if self._duration_until is not self.last_updated:
+            self._duration = int((self.last_updated - self.started_at).total_seconds())
+            self._duration_until = self.last_updated
+        return self._duration
+    
+    def add_turn(self, turn: ConversationTurn) -> None:
+        """Append a turn, keeping history_dicts in sync"""
+        self.turns.append(turn)
+        if self._history_dicts is not None:
+            self._history_dicts.append({"role": turn.role, "content": turn.content})
+        # The turn already carries the request's clock read
+        self.last_updated = turn.timestamp
 
 
 class StrategyChoice(BaseModel):
@@ -77,3 +137,9 @@ class StrategyChoice(BaseModel):
         "neutral"
     ] = Field(..., description="Selected engagement strategy")
     reasoning: str = Field(default="", description="Reasoning for strategy choice")
+
+
+class AgentDecision(BaseModel):
+    """Combined strategy selection and reply from a single agent call"""
+    strategy: StrategyChoice = Field(..., description="Selected engagement strategy")
+    reply: str = Field(..., description="Agent's reply message")
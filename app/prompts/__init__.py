@@ -2,13 +2,16 @@
 Prompt templates for LLM interactions
 """
 
+from functools import lru_cache
 from pathlib import Path
 
+PROMPT_DIR = Path(__file__).parent
 
+
+@lru_cache(maxsize=None)
 def load_prompt(prompt_name: str) -> str:
-    """Load a prompt template from file"""
-    prompt_dir = Path(__file__).parent
-    prompt_file = prompt_dir / f"{prompt_name}.txt"
+    """Load a prompt template from file, reading each file only once"""
+    prompt_file = PROMPT_DIR / f"{prompt_name}.txt"
     
     if not prompt_file.exists():
         raise FileNotFoundError(f"Prompt file not found: {prompt_file}")
@@ -18,14 +21,14 @@ def load_prompt(prompt_name: str) -> str:
 
 # Pre-load prompts
 DETECTION_PROMPT = load_prompt("detection_prompt")
-AGENT_PERSONA_PROMPT = load_prompt("agent_persona_prompt")
 EXTRACTION_PROMPT = load_prompt("extraction_prompt")
-STRATEGY_PROMPT = load_prompt("strategy_prompt")
+DECISION_PROMPT = load_prompt("decision_prompt")
+BATCH_EXTRACTION_PROMPT = load_prompt("batch_extraction_prompt")
 
 __all__ = [
     "load_prompt",
     "DETECTION_PROMPT",
-    "AGENT_PERSONA_PROMPT",
     "EXTRACTION_PROMPT",
-    "STRATEGY_PROMPT",
+    "DECISION_PROMPT",
+    "BATCH_EXTRACTION_PROMPT",
 ]
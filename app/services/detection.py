@@ -4,8 +4,14 @@ Scam Intent Detection Service
 
 import re
 import logging
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Set
 
+try:
+    import hyperscan
+except ImportError:  # Optional, x86-64 only
+    hyperscan = None
+
+from app.config import get_settings
 from app.models import ScamDetectionResult
 from app.prompts import DETECTION_PROMPT
 from app.services.llm import get_llm_service
@@ -13,6 +19,40 @@ from app.services.llm import get_llm_service
 logger = logging.getLogger(__name__)
 
 
+def _build_hyperscan_db(patterns: List[str]) -> Optional["hyperscan.Database"]:
+    """
+    Compile keyword categories into a Hyperscan database, if available
+    
+    Args:
+        patterns: One regex per category; ids are list positions
+    
+    Returns:
+        Database reporting each category at most once per scan, or None
+        to use the regex scanner
+    """
+    if hyperscan is None:
+        return None
+    
+    # Hyperscan has no UCP support for \b, so word boundaries are ASCII;
+    # this only differs from re when a keyword is glued to non-ASCII letters
+    flags = (
+        hyperscan.HS_FLAG_CASELESS
+        | hyperscan.HS_FLAG_SINGLEMATCH
+        | hyperscan.HS_FLAG_UTF8
+    )
+    try:
+        db = hyperscan.Database()
+        db.compile(
+            expressions=[p.encode() for p in patterns],
+            ids=list(range(len(patterns))),
+            flags=[flags] * len(patterns)
+        )
+        return db
+    except Exception as e:
+        logger.warning(f"Hyperscan compile failed, using regex scanner: {e}")
+        return None
+
+
 class ScamDetectionService:
     """Service for detecting scam intent in messages"""
     
@@ -32,14 +72,91 @@ class ScamDetectionService:
         r'\b(pin|cvv|password|credentials)\b',
     ]
     
-    # URL pattern
-    URL_PATTERN = r'https?://[^\s<>"{}|\\^`\[\]]+'
+    # Characters that can appear in a URL, and link shortener domains
+    URL_CHARS = r'[^\s<>"{}|\\^`\[\]]'
     SHORT_URL_DOMAINS = ['bit.ly', 'tinyurl', 'goo.gl', 't.co', 'rebrand.ly', 'is.gd', 'v.gd']
     
+    # Messages shorter than this with no scam hint skip detection entirely
+    BENIGN_MAX_LENGTH = 80
+    
+    # Anything that might carry an entity or a link also rules out the prefilter
+    EXTRA_HINTS = [
+        r'https?://|www\.',
+        r'\d{5}',
+        r'@\w+',
+    ]
+    
+    # Patterns are compiled once at import and shared by every instance.
+    # The keyword and hint patterns run on lowercased text and are compiled
+    # case-sensitive, which keeps case folding out of the matching loop.
+    # All keyword categories go in one alternation, so a message is scanned
+    # once instead of once per category. Each category is a named
+    # lookahead group: overlapping matches from different categories
+    # still count separately, as with one search per category
+    KEYWORD_PATTERN = re.compile(
+        '|'.join(f'(?=(?P<k{i}>{p}))' for i, p in enumerate(SCAM_KEYWORDS))
+    )
+    HYPERSCAN_DB = _build_hyperscan_db(SCAM_KEYWORDS)
+    # A URL pointing at (or through) a shortener, found in one search.
+    # The lazy run stays within URL characters, so this matches exactly
+    # when some URL contains a shortener domain
+    SHORT_URL_PATTERN = re.compile(
+        rf'https?://{URL_CHARS}*?(?:'
+        + '|'.join(re.escape(domain) for domain in SHORT_URL_DOMAINS) + ')',
+        re.IGNORECASE
+    )
+    # Single alternation so the prefilter is one scan of the message
+    SCAM_HINT_PATTERN = re.compile(
+        '|'.join(f'(?:{p})' for p in SCAM_KEYWORDS + EXTRA_HINTS)
+    )
+    
     def __init__(self):
         self._llm = get_llm_service()
-        self._compiled_patterns = [re.compile(p, re.IGNORECASE) for p in self.SCAM_KEYWORDS]
-        self._url_pattern = re.compile(self.URL_PATTERN, re.IGNORECASE)
+        
+        settings = get_settings()
+        self._skip_llm_above = settings.detection_skip_llm_above
+        self._skip_llm_below = settings.detection_skip_llm_below
+    
+    @staticmethod
+    def _on_hyperscan_match(pattern_id: int, start: int, end: int, flags: int, matched: Set[int]) -> None:
+        """Record the category of a Hyperscan match"""
+        matched.add(pattern_id)
+    
+    def _count_keyword_categories(self, message: str) -> int:
+        """Count the keyword categories present in a message"""
+        if self.HYPERSCAN_DB is not None:
+            # One SIMD pass over the bytes for every category at once
+            matched: Set[int] = set()
+            self.HYPERSCAN_DB.scan(
+                message.encode(),
+                match_event_handler=self._on_hyperscan_match,
+                context=matched
+            )
+            return len(matched)
+        
+        return len({
+            match.lastgroup for match in self.KEYWORD_PATTERN.finditer(message.lower())
+        })
+    
+    @property
+    def uses_history(self) -> bool:
+        """Whether detect() reads conversation history (heuristics do not)"""
+        return self._llm.is_available
+    
+    def is_obviously_benign(self, message: str) -> bool:
+        """
+        Cheap prefilter for short messages with no scam hints at all
+        
+        Every heuristic keyword is part of the hint pattern, so a message
+        this returns True for would never be flagged by the heuristics.
+        
+        Returns:
+            True if detection can be skipped
+        """
+        return (
+            len(message) < self.BENIGN_MAX_LENGTH
+            and self.SCAM_HINT_PATTERN.search(message.lower()) is None
+        )
     
     def _heuristic_detection(self, message: str) -> tuple[bool, float]:
         """
@@ -52,25 +169,11 @@ class ScamDetectionService:
         if not isinstance(message, str):
             message = str(message) if message else ""
         
-        message_lower = message.lower()
-        
-        # Count matching patterns
-        match_count = 0
-        for pattern in self._compiled_patterns:
-            if pattern.search(message):
-                match_count += 1
-        
-        # Check for URLs
-        urls = self._url_pattern.findall(message)
-        has_suspicious_url = False
-        for url in urls:
-            for domain in self.SHORT_URL_DOMAINS:
-                if domain in url.lower():
-                    has_suspicious_url = True
-                    break
+        # Count matching keyword categories
+        match_count = self._count_keyword_categories(message)
         
-        # Calculate heuristic confidence
-        if has_suspicious_url:
+        # Shortened links are a strong signal
+        if self.SHORT_URL_PATTERN.search(message):
             match_count += 2
         
         # Determine if scam based on pattern matches
@@ -94,21 +197,32 @@ class ScamDetectionService:
         Args:
             message: The message to analyze
             conversation_history: Optional conversation context
-            
+        
         Returns:
             ScamDetectionResult with is_scam and confidence
         """
         # First, apply heuristic detection
         heuristic_scam, heuristic_confidence = self._heuristic_detection(message)
         
+        # The LLM is only consulted when the heuristics are not decisive
+        if (
+            not self._llm.is_available
+            or heuristic_confidence >= self._skip_llm_above
+            or heuristic_confidence <= self._skip_llm_below
+        ):
+            return ScamDetectionResult(
+                is_scam=heuristic_scam,
+                confidence=round(heuristic_confidence, 2)
+            )
+        
         try:
             # Build context for LLM
             context_messages = ""
             if conversation_history:
-                for turn in conversation_history[-5:]:  # Last 5 turns for context
-                    role = turn.get("role", "user")
-                    content = turn.get("content", "")
-                    context_messages += f"{role}: {content}\n"
+                context_messages = "".join(
+                    f"{turn.get('role', 'user')}: {turn.get('content', '')}\n"
+                    for turn in conversation_history[-5:]  # Last 5 turns for context
+                )
             
             user_prompt = f"""Conversation context:
 {context_messages}
@@ -141,17 +255,16 @@ Classify this message for scam intent."""
                 final_confidence = min(confidence, heuristic_confidence)
             
             logger.info(
-                f"Scam detection result: is_scam={is_scam}, "
-                f"confidence={final_confidence:.2f}, "
-                f"llm_conf={confidence:.2f}, "
-                f"heuristic_conf={heuristic_confidence:.2f}"
+                "Scam detection result: is_scam=%s, confidence=%.2f, "
+                "llm_conf=%.2f, heuristic_conf=%.2f",
+                is_scam, final_confidence, confidence, heuristic_confidence
             )
             
             return ScamDetectionResult(
                 is_scam=is_scam,
                 confidence=round(final_confidence, 2)
             )
-            
+        
         except Exception as e:
             logger.warning(f"LLM detection failed, using heuristics only: {e}")
             return ScamDetectionResult(
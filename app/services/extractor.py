@@ -2,17 +2,215 @@
 Intelligence Extraction Service
 """
 
+import asyncio
 import re
 import logging
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Set, Tuple
 
+from app.config import get_settings
 from app.models import Intelligence
-from app.prompts import EXTRACTION_PROMPT
-from app.services.llm import get_llm_service
+from app.prompts import EXTRACTION_PROMPT, BATCH_EXTRACTION_PROMPT
+from app.services.llm import LLMService, get_llm_service
 
 logger = logging.getLogger(__name__)
 
 
+class ExtractionBatcher:
+    """
+    Coalesces concurrent extractions from different conversations into a
+    single LLM call.
+    
+    Extraction does not affect the reply, so it can wait a short window for
+    other requests to join the batch.
+    """
+    
+    MAX_BATCH = 16
+    
+    # Batches waiting on the LLM at once. When all are busy the drain loop
+    # stops pulling and callers wait to enqueue once MAX_QUEUED are waiting
+    MAX_IN_FLIGHT = 8
+    MAX_QUEUED = MAX_BATCH * MAX_IN_FLIGHT
+    
+    def __init__(self, llm: LLMService, window_ms: int):
+        self._llm = llm
+        self._window = window_ms / 1000
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._dispatches: Set[asyncio.Task] = set()
+        self._slots: Optional[asyncio.Semaphore] = None
+    
+    async def extract(self, conversation_text: str) -> Dict[str, Any]:
+        """
+        Queue a conversation for the next batch and wait for its result
+        
+        Args:
+            conversation_text: Formatted conversation transcript
+        
+        Returns:
+            Raw extraction result for this conversation
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self._get_queue().put((conversation_text, future))
+        return await future
+    
+    def _get_queue(self) -> asyncio.Queue:
+        """Get the queue, starting the drain loop if needed"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            # The drain loop is bound to the event loop it was started on
+            self._queue = asyncio.Queue(maxsize=self.MAX_QUEUED)
+            self._slots = asyncio.Semaphore(self.MAX_IN_FLIGHT)
+            self._dispatches.clear()
+            self._worker = loop.create_task(self._drain(self._queue, self._slots))
+            self._loop = loop
+        return self._queue
+    
+    async def _drain(self, queue: asyncio.Queue, slots: asyncio.Semaphore) -> None:
+        """Collect requests for up to the batch window, then dispatch them"""
+        loop = asyncio.get_running_loop()
+        while True:
+            await slots.acquire()
+            batch = [await queue.get()]
+            deadline = loop.time() + self._window
+            
+            while len(batch) < self.MAX_BATCH:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            
+            # Dispatched in the background so the next batch can form while
+            # this one waits on the LLM
+            dispatch = loop.create_task(self._dispatch(batch))
+            self._dispatches.add(dispatch)
+            dispatch.add_done_callback(self._dispatches.discard)
+            dispatch.add_done_callback(lambda _: slots.release())
+    
+    async def _dispatch(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        """Send one LLM call for the batch and resolve each caller's future"""
+        try:
+            if len(batch) == 1:
+                results: Dict[int, Any] = {0: await self._extract_one(batch[0][0])}
+            else:
+                logger.debug("Dispatching extraction batch of %d", len(batch))
+                response = await self._llm.complete_json(
+                    system_prompt=BATCH_EXTRACTION_PROMPT,
+                    user_message="\n".join(
+                        f"### CONV {i}\n{text}" for i, (text, _) in enumerate(batch)
+                    ),
+                    temperature=0.1
+                )
+                results = self._index_results(response, len(batch))
+                
+                # Conversations the batch response lost or answered twice are
+                # extracted on their own rather than guessed at
+                missing = [
+                    i for i, (_, future) in enumerate(batch)
+                    if i not in results and not future.done()
+                ]
+                if missing:
+                    logger.debug("Re-extracting %d conversations from batch individually", len(missing))
+                    fallbacks = await asyncio.gather(
+                        *(self._extract_one(batch[i][0]) for i in missing),
+                        return_exceptions=True
+                    )
+                    results.update(zip(missing, fallbacks))
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        
+        for i, (_, future) in enumerate(batch):
+            if future.done():
+                # Caller was cancelled while waiting
+                continue
+            result = results.get(i)
+            if isinstance(result, dict):
+                future.set_result(result)
+            elif isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_exception(ValueError("Conversation missing from extraction response"))
+    
+    async def _extract_one(self, conversation_text: str) -> Dict[str, Any]:
+        """Extract a single conversation with the standalone prompt"""
+        return await self._llm.complete_json(
+            system_prompt=EXTRACTION_PROMPT,
+            user_message=f"Extract intelligence from this conversation:\n\n{conversation_text}",
+            temperature=0.1
+        )
+    
+    @staticmethod
+    def _index_results(response: Dict[str, Any], size: int) -> Dict[int, Dict[str, Any]]:
+        """
+        Map batch response entries to their conversation by the "conv" index
+        
+        Args:
+            response: Parsed batch extraction response
+            size: Number of conversations in the batch
+        
+        Returns:
+            Result per index; indices that are missing, out of range or
+            claimed by more than one entry are left out
+        """
+        entries = response.get("conversations")
+        if not isinstance(entries, list):
+            return {}
+        
+        results: Dict[int, Dict[str, Any]] = {}
+        duplicated: Set[int] = set()
+        for entry in entries:
+            if not isinstance(entry, dict):
+                continue
+            index = entry.get("conv")
+            if isinstance(index, bool) or not isinstance(index, int) or not 0 <= index < size:
+                continue
+            if index in results:
+                duplicated.add(index)
+            results[index] = {key: value for key, value in entry.items() if key != "conv"}
+        
+        for index in duplicated:
+            del results[index]
+        return results
+    
+    async def close(self) -> None:
+        """Stop the drain loop and any batches in flight"""
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker = None
+        for dispatch in list(self._dispatches):
+            dispatch.cancel()
+        self._dispatches.clear()
+
+
+def _compile_scanners(
+    patterns: Dict[str, "re.Pattern[str]"],
+    order: Tuple[str, ...]
+) -> List["re.Pattern[str]"]:
+    """
+    Combine patterns into named-group alternations
+    
+    Args:
+        patterns: Pattern per entity kind
+        order: Kinds by priority
+    
+    Returns:
+        One alternation per suffix of order, highest priority first
+    """
+    return [
+        re.compile(
+            "|".join(f"(?P<{name}>{patterns[name].pattern})" for name in order[i:]),
+            re.IGNORECASE
+        )
+        for i in range(len(order))
+    ]
+
+
 class IntelligenceExtractor:
     """Service for extracting scam intelligence from conversations"""
     
@@ -43,15 +241,74 @@ class IntelligenceExtractor:
         ),
     }
     
+    # Priority for the combined scan: where kinds overlap (a phone number in a
+    # UPI ID, an account number in a URL) the earlier kind wins the scan and
+    # its span is rescanned for the later ones
+    SCAN_ORDER = ("url", "upi", "ifsc", "phone", "bank_account")
+    
+    # One alternation per suffix of SCAN_ORDER, for rescanning spans.
+    # Compiled once at import and shared by every instance
+    SCANNERS = _compile_scanners(PATTERNS, SCAN_ORDER)
+    
+    # Phone separators: hyphen and everything \s matches
+    PHONE_SEPARATORS = str.maketrans(
+        "", "", "-" + "".join(chr(c) for c in range(0x3001) if chr(c).isspace())
+    )
+    
+    # Cheap pre-filter: text without any of these cannot yield new entities.
+    # Every PATTERNS kind must be covered, since incremental extraction
+    # relies on skipped turns holding nothing
+    ENTITY_HINT = re.compile(r'\d{5}|https?://|www\.|@\w+|\b[A-Z]{4}0', re.IGNORECASE)
+    
     # UPI bank suffixes
     UPI_SUFFIXES = [
         '@ybl', '@upi', '@paytm', '@oksbi', '@okicici', '@okhdfcbank',
         '@axl', '@ibl', '@sbi', '@icici', '@hdfc', '@axis', '@kotak',
         '@freecharge', '@apl', '@pnb', '@boi', '@cbin', '@federal'
     ]
+    # The UPI pattern allows a single "@", so a suffix match is a lookup
+    # of the handle after it
+    UPI_HANDLES = frozenset(suffix[1:] for suffix in UPI_SUFFIXES)
     
     def __init__(self):
         self._llm = get_llm_service()
+        self._batcher: Optional[ExtractionBatcher] = None
+        
+        window_ms = get_settings().extraction_batch_window_ms
+        if window_ms > 0:
+            self._batcher = ExtractionBatcher(self._llm, window_ms)
+    
+    def has_entity_hints(self, text: str) -> bool:
+        """Check whether text could contain any extractable entity"""
+        return self.ENTITY_HINT.search(text) is not None
+    
+    def _scan(
+        self,
+        text: str,
+        order_index: int,
+        pos: int,
+        endpos: int,
+        found: Dict[str, Set[str]]
+    ) -> None:
+        """Collect matches of SCAN_ORDER[order_index:] in text[pos:endpos]"""
+        for match in self.SCANNERS[order_index].finditer(text, pos, endpos):
+            kind = match.lastgroup
+            found[kind].add(match.group(kind))
+            
+            next_index = self.SCAN_ORDER.index(kind) + 1
+            if next_index < len(self.SCAN_ORDER):
+                self._scan(text, next_index, match.start(), match.end(), found)
+    
+    @staticmethod
+    def _merge(first: Intelligence, second: Intelligence) -> Intelligence:
+        """Combine the unique values of two extraction results"""
+        return Intelligence(
+            upi_ids=list(set(first.upi_ids + second.upi_ids)),
+            bank_accounts=list(set(first.bank_accounts + second.bank_accounts)),
+            ifsc_codes=list(set(first.ifsc_codes + second.ifsc_codes)),
+            urls=list(set(first.urls + second.urls)),
+            phones=list(set(first.phones + second.phones))
+        )
     
     def _regex_extraction(self, text: str) -> Intelligence:
         """
@@ -59,46 +316,31 @@ class IntelligenceExtractor:
         
         Args:
             text: Text to extract from
-            
+        
         Returns:
             Intelligence object with extracted data
         """
-        # Extract UPI IDs
-        upi_matches = self.PATTERNS["upi"].findall(text)
+        found: Dict[str, Set[str]] = {name: set() for name in self.SCAN_ORDER}
+        self._scan(text, 0, 0, len(text), found)
+        
         upi_ids = [
-            match for match in upi_matches
-            if any(match.lower().endswith(suffix) for suffix in self.UPI_SUFFIXES)
+            match for match in found["upi"]
+            if match.rpartition("@")[2].lower() in self.UPI_HANDLES
         ]
         
-        # Extract bank accounts
-        bank_accounts = list(set(self.PATTERNS["bank_account"].findall(text)))
-        
-        # Extract IFSC codes
-        ifsc_codes = list(set(self.PATTERNS["ifsc"].findall(text.upper())))
-        
-        # Extract URLs
-        urls = list(set(self.PATTERNS["url"].findall(text)))
-        
-        # Extract phone numbers and normalize
-        phone_matches = self.PATTERNS["phone"].findall(text)
-        phones = []
-        for phone in phone_matches:
-            # Normalize: remove spaces and hyphens
-            normalized = re.sub(r'[-\s]', '', phone)
-            if normalized not in phones:
-                phones.append(normalized)
-        
         return Intelligence(
-            upi_ids=list(set(upi_ids)),
-            bank_accounts=bank_accounts,
-            ifsc_codes=ifsc_codes,
-            urls=urls,
-            phones=phones
+            upi_ids=upi_ids,
+            bank_accounts=list(found["bank_account"]),
+            ifsc_codes=list({code.upper() for code in found["ifsc"]}),
+            urls=list(found["url"]),
+            phones=list({phone.translate(self.PHONE_SEPARATORS) for phone in found["phone"]})
         )
     
     async def extract(
         self,
-        conversation_history: List[Dict[str, Any]]
+        conversation_history: List[Dict[str, Any]],
+        previous: Optional[Intelligence] = None,
+        covered_turns: int = 0
     ) -> Intelligence:
         """
         Extract intelligence from full conversation history
@@ -107,33 +349,46 @@ class IntelligenceExtractor:
         
         Args:
             conversation_history: List of conversation turns
-            
+            previous: Intelligence already extracted from the first
+                covered_turns turns. Regex extraction then only scans the
+                turns after those and adds to it, instead of rescanning the
+                whole history
+            covered_turns: Number of leading turns previous was extracted from
+        
         Returns:
             Intelligence object with extracted data
         """
-        # Combine all messages into text
-        full_text = "\n".join([
-            turn.get("content", "") for turn in conversation_history
-        ])
-        
         # First, apply regex extraction
-        regex_intel = self._regex_extraction(full_text)
+        if previous is not None:
+            unscanned = "\n".join([
+                turn.get("content", "") for turn in conversation_history[covered_turns:]
+            ])
+            regex_intel = self._merge(previous, self._regex_extraction(unscanned))
+        else:
+            regex_intel = self._regex_extraction("\n".join([
+                turn.get("content", "") for turn in conversation_history
+            ]))
+        
+        if not self._llm.is_available:
+            return regex_intel
         
         try:
             # Build conversation text for LLM
-            conversation_text = ""
-            for turn in conversation_history:
-                role = turn.get("role", "user")
-                content = turn.get("content", "")
-                conversation_text += f"{role}: {content}\n"
-            
-            # Get LLM extraction
-            result = await self._llm.complete_json(
-                system_prompt=EXTRACTION_PROMPT,
-                user_message=f"Extract intelligence from this conversation:\n\n{conversation_text}",
-                temperature=0.1
+            conversation_text = "".join(
+                f"{turn.get('role', 'user')}: {turn.get('content', '')}\n"
+                for turn in conversation_history
             )
             
+            # Get LLM extraction, batched with other conversations if enabled
+            if self._batcher is not None:
+                result = await self._batcher.extract(conversation_text)
+            else:
+                result = await self._llm.complete_json(
+                    system_prompt=EXTRACTION_PROMPT,
+                    user_message=f"Extract intelligence from this conversation:\n\n{conversation_text}",
+                    temperature=0.1
+                )
+            
             # Merge LLM and regex results
             llm_intel = Intelligence(
                 upi_ids=result.get("upi_ids", []),
@@ -143,28 +398,26 @@ class IntelligenceExtractor:
                 phones=result.get("phones", [])
             )
             
-            # Combine unique values
-            combined = Intelligence(
-                upi_ids=list(set(regex_intel.upi_ids + llm_intel.upi_ids)),
-                bank_accounts=list(set(regex_intel.bank_accounts + llm_intel.bank_accounts)),
-                ifsc_codes=list(set(regex_intel.ifsc_codes + llm_intel.ifsc_codes)),
-                urls=list(set(regex_intel.urls + llm_intel.urls)),
-                phones=list(set(regex_intel.phones + llm_intel.phones))
-            )
+            combined = self._merge(regex_intel, llm_intel)
             
             logger.info(
-                f"Extracted intelligence: "
-                f"upi={len(combined.upi_ids)}, "
-                f"accounts={len(combined.bank_accounts)}, "
-                f"urls={len(combined.urls)}, "
-                f"phones={len(combined.phones)}"
+                "Extracted intelligence: upi=%d, accounts=%d, urls=%d, phones=%d",
+                len(combined.upi_ids),
+                len(combined.bank_accounts),
+                len(combined.urls),
+                len(combined.phones)
             )
             
             return combined
-            
+        
         except Exception as e:
             logger.warning(f"LLM extraction failed, using regex only: {e}")
             return regex_intel
+    
+    async def close(self) -> None:
+        """Stop the extraction batcher, if any"""
+        if self._batcher is not None:
+            await self._batcher.close()
 
 
 # Singleton instance
@@ -1,23 +1,111 @@
 """
-LLM Service - Heuristic-based response generator (No OpenAI required)
+LLM Service - Optional OpenAI-compatible backend (heuristic fallback when not configured)
 """
 
+import asyncio
+import hashlib
 import logging
-from typing import Optional, List, Dict, Any
+import random
+import re
+import threading
+from typing import Optional, List, Dict, Any, Set, Tuple
+
+import httpx
+import orjson
+from cachetools import LRUCache
+
+from app.config import get_settings
 
 logger = logging.getLogger(__name__)
 
 
 class LLMService:
-    """Service for generating responses using heuristic rules (no external LLM)"""
+    """Service for LLM completions; callers fall back to heuristics when unavailable"""
+    
+    # Completions above this temperature are meant to vary, so they are
+    # never served from a cache
+    CACHE_MAX_TEMPERATURE = 0.5
+    
+    # JSON completions kept for exact repeats of a call. Stored serialized,
+    # so every hit parses a copy the caller is free to change
+    JSON_CACHE_MAXSIZE = 1024
+    
+    # Conversations whose last sent history is kept for prefix checks
+    PREFIX_TRACK_MAXSIZE = 1024
+    
+    # Outbound connection pool, shared by every request in the process
+    MAX_CONNECTIONS = 256
+    MAX_KEEPALIVE_CONNECTIONS = 128
+    JSON_HEADERS = {"Content-Type": "application/json"}
+    
+    # Responses larger than this are parsed in a worker thread so a long
+    # completion does not stall the event loop
+    OFFLOAD_PARSE_BYTES = 32_768
+    # httpx drops idle connections after 5s by default, which makes
+    # sporadic traffic pay a fresh TLS handshake on most calls
+    KEEPALIVE_EXPIRY_SECONDS = 60.0
+    REQUEST_TIMEOUT_SECONDS = 30.0
+    CONNECT_TIMEOUT_SECONDS = 5.0
+    
+    # Transient failures are retried with exponential backoff and full
+    # jitter, so a burst of failed calls does not retry in lockstep
+    MAX_RETRIES = 3
+    RETRY_BASE_DELAY_SECONDS = 0.2
+    RETRY_MAX_DELAY_SECONDS = 4.0
+    RETRY_STATUS_CODES = frozenset({408, 409, 429, 500, 502, 503, 504})
+    
+    # Markdown code fences around a JSON completion, either one optional
+    FENCE_PATTERN = re.compile(r"\s*(?:```(?:json)?)?\s*(.*?)\s*(?:```)?\s*", re.DOTALL)
     
     def __init__(self):
-        logger.info("LLM Service initialized in heuristic-only mode (no OpenAI)")
+        self._queues: Dict[str, asyncio.Queue] = {}
+        self._workers: Dict[str, asyncio.Task] = {}
+        self._dispatches: Set[asyncio.Task] = set()
+        # Low-temperature requests in flight, keyed by request digest
+        self._inflight: Dict[bytes, asyncio.Task] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        # JSON completions keyed by a digest of every input
+        self._json_cache: LRUCache = LRUCache(maxsize=self.JSON_CACHE_MAXSIZE)
+        # Last history sent per conversation, as (role, content) pairs
+        self._sent_histories: LRUCache = LRUCache(maxsize=self.PREFIX_TRACK_MAXSIZE)
+        # JSON calls ask for JSON mode until the provider rejects it
+        self._json_mode = True
+        
+        settings = get_settings()
+        self._model = settings.llm_model
+        # Micro-batching: concurrent calls arriving within the wait window
+        # are dispatched together, with at most max_parallel in flight
+        self._max_batch = settings.llm_batch_size
+        self._max_wait = settings.llm_batch_wait_ms / 1000
+        self._max_parallel = settings.llm_max_parallel
+        
+        if settings.llm_api_key:
+            # One pooled HTTP/2 client keeps connections (and TLS sessions)
+            # alive across calls instead of reconnecting per request
+            self._client = httpx.AsyncClient(
+                base_url=settings.llm_base_url,
+                headers={"Authorization": f"Bearer {settings.llm_api_key}"},
+                http2=True,
+                limits=httpx.Limits(
+                    max_connections=self.MAX_CONNECTIONS,
+                    max_keepalive_connections=self.MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=self.KEEPALIVE_EXPIRY_SECONDS
+                ),
+                timeout=httpx.Timeout(
+                    self.REQUEST_TIMEOUT_SECONDS,
+                    connect=self.CONNECT_TIMEOUT_SECONDS
+                )
+            )
+            logger.info(f"LLM Service initialized with model {self._model}")
+        else:
+            logger.info("LLM Service initialized in heuristic-only mode (no LLM_API_KEY)")
     
     @property
     def is_available(self) -> bool:
-        """Check if LLM is available - always False since we don't use OpenAI"""
-        return False
+        """Check if an LLM backend is configured"""
+        return self._client is not None
     
     async def complete(
         self,
@@ -25,42 +113,346 @@ class LLMService:
         user_message: str,
         conversation_history: Optional[List[Dict[str, str]]] = None,
         temperature: float = 0.7,
-        max_tokens: int = 1000
+        max_tokens: int = 1000,
+        context: Optional[str] = None,
+        conversation_id: Optional[str] = None
     ) -> str:
         """
-        Generate a completion using heuristic rules (no OpenAI)
+        Generate a completion
+        
+        Raises ValueError when no LLM is configured so callers can fall
+        back to heuristics.
+        
+        Concurrent identical low-temperature calls share one request.
+        
+        conversation_history must be the raw, append-only history: the
+        provider caches the prompt prefix, so rewriting or summarizing
+        earlier turns makes it recompute all of them. Per-turn notes go in
+        context, which is sent after the history. When conversation_id is
+        given, a history that does not extend the previous one is logged.
         
         Returns:
             Generated response text
         """
-        # Return a heuristic-based response
-        logger.info("Generating heuristic-based response")
-        raise ValueError("LLM not configured - using heuristic fallback")
+        if not self.is_available:
+            # Return a heuristic-based response
+            logger.debug("Generating heuristic-based response")
+            raise ValueError("LLM not configured - using heuristic fallback")
+        
+        if conversation_id and conversation_history:
+            self._validate_prefix(conversation_id, conversation_history)
+        
+        payload = {
+            "system_prompt": system_prompt,
+            "user_message": user_message,
+            "conversation_history": conversation_history,
+            "context": context,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+        }
+        if temperature <= self.CACHE_MAX_TEMPERATURE:
+            return await self._submit_once("text", payload, self._request_key("text", payload))
+        return await self._submit("text", payload)
     
     async def complete_json(
         self,
         system_prompt: str,
         user_message: str,
         conversation_history: Optional[List[Dict[str, str]]] = None,
-        temperature: float = 0.3
+        temperature: float = 0.3,
+        context: Optional[str] = None,
+        conversation_id: Optional[str] = None
     ) -> Dict[str, Any]:
         """
-        Generate a JSON response using heuristic rules (no OpenAI)
+        Generate a JSON response
+        
+        Raises ValueError when no LLM is configured so callers can fall
+        back to heuristics.
+        
+        Low-temperature calls repeating an earlier or in-flight call exactly
+        get their own copy of its result.
+        
+        History and context follow the same rules as complete().
         
         Returns:
             Parsed JSON response
         """
-        logger.info("Generating heuristic-based JSON response")
-        raise ValueError("LLM not configured - using heuristic fallback")
+        if not self.is_available:
+            logger.debug("Generating heuristic-based JSON response")
+            raise ValueError("LLM not configured - using heuristic fallback")
+        
+        if conversation_id and conversation_history:
+            self._validate_prefix(conversation_id, conversation_history)
+        
+        # JSON calls share a response format, so they are batched separately
+        payload = {
+            "system_prompt": system_prompt,
+            "user_message": user_message,
+            "conversation_history": conversation_history,
+            "context": context,
+            "temperature": temperature,
+        }
+        if temperature > self.CACHE_MAX_TEMPERATURE:
+            return await self._submit("json", payload)
+        
+        key = self._request_key("json", payload)
+        raw = self._json_cache.get(key)
+        if raw is None:
+            raw = orjson.dumps(await self._submit_once("json", payload, key))
+            self._json_cache[key] = raw
+        return orjson.loads(raw)
+    
+    @staticmethod
+    def _request_key(kind: str, payload: Dict[str, Any]) -> bytes:
+        """Digest every input of a request"""
+        digest = hashlib.blake2b(kind.encode(), digest_size=16)
+        # Payloads are built with a fixed key order, so equal inputs
+        # always encode to the same bytes
+        digest.update(orjson.dumps(payload))
+        return digest.digest()
+    
+    def _validate_prefix(
+        self,
+        conversation_id: str,
+        conversation_history: List[Dict[str, str]]
+    ) -> None:
+        """Warn when a conversation's history does not extend the one sent before"""
+        sent = tuple((turn["role"], turn["content"]) for turn in conversation_history)
+        previous = self._sent_histories.get(conversation_id)
+        if previous is not None and sent[:len(previous)] != previous:
+            logger.warning(
+                f"History for conversation {conversation_id} diverged from the "
+                f"previous request; the provider prompt cache will miss"
+            )
+        self._sent_histories[conversation_id] = sent
+    
+    async def _submit_once(self, kind: str, payload: Dict[str, Any], key: bytes) -> Any:
+        """Submit a request, sharing the result with identical requests in flight"""
+        self._bind_loop()
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.get_running_loop().create_task(self._submit(kind, payload))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finish_inflight(key, done))
+        # Shielded so one caller being cancelled does not cancel the rest
+        return await asyncio.shield(task)
+    
+    def _finish_inflight(self, key: bytes, task: asyncio.Task) -> None:
+        """Forget a finished in-flight request"""
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            # Retrieved here in case every caller was cancelled, so a
+            # failure is not reported as never retrieved
+            task.exception()
+    
+    async def _submit(self, kind: str, payload: Dict[str, Any]) -> Any:
+        """Queue a request for the batch worker and wait for its result"""
+        future = asyncio.get_running_loop().create_future()
+        self._get_queue(kind).put_nowait((payload, future))
+        return await future
+    
+    def _bind_loop(self) -> asyncio.AbstractEventLoop:
+        """Reset loop-bound state if the running loop has changed"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Workers are bound to the loop they were started on
+            self._queues.clear()
+            self._workers.clear()
+            self._dispatches.clear()
+            self._inflight.clear()
+            self._semaphore = asyncio.Semaphore(self._max_parallel)
+            self._loop = loop
+        return loop
+    
+    def _get_queue(self, kind: str) -> asyncio.Queue:
+        """Get the queue for a request kind, starting its worker if needed"""
+        loop = self._bind_loop()
+        worker = self._workers.get(kind)
+        if worker is None or worker.done():
+            queue: asyncio.Queue = asyncio.Queue()
+            self._queues[kind] = queue
+            self._workers[kind] = loop.create_task(self._batch_worker(kind, queue))
+        return self._queues[kind]
+    
+    async def _batch_worker(self, kind: str, queue: asyncio.Queue) -> None:
+        """Drain the queue in batches of up to the batch size or wait window"""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await queue.get()]
+            deadline = loop.time() + self._max_wait
+            
+            while len(batch) < self._max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            
+            # Dispatched in the background so the next batch can form while
+            # this one waits on the provider
+            dispatch = loop.create_task(self._dispatch_batch(kind, batch))
+            self._dispatches.add(dispatch)
+            dispatch.add_done_callback(self._dispatches.discard)
+    
+    async def _dispatch_batch(
+        self,
+        kind: str,
+        batch: List[Tuple[Dict[str, Any], asyncio.Future]]
+    ) -> None:
+        """Send a batch to the provider and resolve each caller's future"""
+        logger.debug("Dispatching %s LLM batch of %d", kind, len(batch))
+        results = await asyncio.gather(
+            *(self._send_limited(kind, payload) for payload, _ in batch),
+            return_exceptions=True
+        )
+        
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                # Caller was cancelled while waiting
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+    
+    async def _send_limited(self, kind: str, payload: Dict[str, Any]) -> Any:
+        """Send a request once fewer than max_parallel are in flight"""
+        async with self._semaphore:
+            return await self._send(kind, payload)
+    
+    @staticmethod
+    def _build_messages(payload: Dict[str, Any]) -> List[Dict[str, str]]:
+        """Build the chat messages for a request"""
+        # History comes from validated turns, so both keys are always present
+        messages = [
+            {"role": "system", "content": payload["system_prompt"]},
+            *(
+                {"role": turn["role"], "content": turn["content"]}
+                for turn in payload["conversation_history"] or ()
+            ),
+        ]
+        if payload["context"] is not None:
+            # After the history, so the cached history prefix is unaffected
+            messages.append({"role": "user", "content": payload["context"]})
+        messages.append({"role": "user", "content": payload["user_message"]})
+        return messages
+    
+    def _build_body(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Build a chat completion request body"""
+        body = {
+            "model": self._model,
+            "messages": self._build_messages(payload),
+            "temperature": payload["temperature"],
+        }
+        if "max_tokens" in payload:
+            body["max_tokens"] = payload["max_tokens"]
+        return body
+    
+    async def _send(self, kind: str, payload: Dict[str, Any]) -> Any:
+        """Send a single chat completion request to the LLM provider"""
+        body = self._build_body(payload)
+        if kind == "json" and self._json_mode:
+            # Constrains the model to emit a bare JSON object
+            body["response_format"] = {"type": "json_object"}
+        # Encoded once and resent as-is on retries
+        encoded = orjson.dumps(body)
+        
+        attempt = 0
+        while True:
+            try:
+                response = await self._client.post(
+                    "/chat/completions", content=encoded, headers=self.JSON_HEADERS
+                )
+                response.raise_for_status()
+                break
+            except Exception as e:
+                if "response_format" in body and self._rejects_json_mode(e):
+                    # Sent once more without it; later calls skip it
+                    logger.warning("LLM provider rejected JSON mode, parsing free-form JSON instead")
+                    self._json_mode = False
+                    del body["response_format"]
+                    encoded = orjson.dumps(body)
+                    continue
+                if attempt >= self.MAX_RETRIES or not self._is_retryable(e):
+                    logger.error(f"LLM completion failed: {e}")
+                    raise
+                delay = random.uniform(
+                    0, min(self.RETRY_MAX_DELAY_SECONDS, self.RETRY_BASE_DELAY_SECONDS * 2 ** attempt)
+                )
+                attempt += 1
+                logger.warning(f"LLM completion failed ({e}), retry {attempt} in {delay:.2f}s")
+                await asyncio.sleep(delay)
+        
+        raw = response.content
+        if len(raw) > self.OFFLOAD_PARSE_BYTES:
+            return await asyncio.to_thread(self._parse_response, kind, raw)
+        return self._parse_response(kind, raw)
+    
+    def _parse_response(self, kind: str, raw: bytes) -> Any:
+        """Extract the completion from a response body, parsed for JSON calls"""
+        content = orjson.loads(raw)["choices"][0]["message"]["content"] or ""
+        if kind == "json":
+            return self._parse_json(content)
+        return content
+    
+    def _is_retryable(self, error: Exception) -> bool:
+        """Check whether a failed request may succeed if sent again"""
+        if isinstance(error, httpx.HTTPStatusError):
+            return error.response.status_code in self.RETRY_STATUS_CODES
+        # Timeouts, connection failures and dropped connections
+        return isinstance(error, httpx.TransportError)
+    
+    @staticmethod
+    def _rejects_json_mode(error: Exception) -> bool:
+        """Check whether a request failed because response_format is unsupported"""
+        return (
+            isinstance(error, httpx.HTTPStatusError)
+            and error.response.status_code in (400, 422)
+            and b"response_format" in error.response.content
+        )
+    
+    def _parse_json(self, response: str) -> Dict[str, Any]:
+        """Parse a JSON completion, tolerating markdown code fences"""
+        try:
+            # JSON mode replies are bare JSON. orjson takes the str
+            # directly, no encode needed
+            return orjson.loads(response)
+        except orjson.JSONDecodeError:
+            pass
+        
+        payload = self.FENCE_PATTERN.fullmatch(response).group(1)
+        try:
+            return orjson.loads(payload)
+        except orjson.JSONDecodeError as e:
+            raise ValueError(f"LLM returned invalid JSON: {e}") from e
+    
+    async def close(self) -> None:
+        """Stop batch workers and close the HTTP client"""
+        for task in [*self._workers.values(), *self._dispatches, *self._inflight.values()]:
+            task.cancel()
+        self._workers.clear()
+        self._dispatches.clear()
+        self._inflight.clear()
+        self._queues.clear()
+        
+        if self._client is not None:
+            await self._client.aclose()
 
 
 # Singleton instance
 _llm_service: Optional[LLMService] = None
+_llm_lock = threading.Lock()
 
 
 def get_llm_service() -> LLMService:
     """Get or create LLM service singleton"""
     global _llm_service
     if _llm_service is None:
-        _llm_service = LLMService()
+        with _llm_lock:
+            # Re-checked under the lock so racing threads share one instance
+            if _llm_service is None:
+                _llm_service = LLMService()
     return _llm_service
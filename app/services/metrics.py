@@ -3,6 +3,7 @@ Engagement Metrics Service
 """
 
 import logging
+import threading
 from datetime import datetime
 from typing import Optional
 
@@ -11,6 +12,17 @@ from app.models import ConversationHistory, EngagementMetrics, Intelligence
 logger = logging.getLogger(__name__)
 
 
+# Engagement score weights, in points per turn, second and entity
+_TURN_WEIGHT = 2.0
+_DURATION_WEIGHT = 0.01
+_ENTITY_WEIGHT = 10.0
+
+# Counts at which each component reaches its cap of 30, 20 and 50 points
+_TURN_CAP = 15
+_DURATION_CAP_SECONDS = 2000
+_ENTITY_CAP = 5
+
+
 class MetricsService:
     """Service for calculating engagement metrics"""
     
@@ -23,7 +35,7 @@ class MetricsService:
         
         Args:
             conversation: The conversation history
-            
+        
         Returns:
             EngagementMetrics with turns and duration
         """
@@ -33,19 +45,11 @@ class MetricsService:
         # Calculate turn count
         turns = len(conversation.turns)
         
-        # Calculate duration in seconds
-        duration_seconds = 0
-        if conversation.started_at and conversation.last_updated:
-            try:
-                delta = conversation.last_updated - conversation.started_at
-                duration_seconds = int(delta.total_seconds())
-            except Exception as e:
-                logger.warning(f"Failed to calculate duration: {e}")
-                duration_seconds = 0
-        
+        # Both timestamps are validated (or built from validated values) as
+        # tz-aware datetimes, so the subtraction cannot fail
         return EngagementMetrics(
             turns=turns,
-            duration_seconds=max(0, duration_seconds)
+            duration_seconds=max(0, conversation.duration_seconds)
         )
     
     def calculate_entity_count(self, intelligence: Intelligence) -> int:
@@ -54,7 +58,7 @@ class MetricsService:
         
         Args:
             intelligence: The extracted intelligence
-            
+        
         Returns:
             Total count of entities
         """
@@ -79,39 +83,39 @@ class MetricsService:
         Args:
             metrics: Engagement metrics
             intelligence: Extracted intelligence
-            
+        
         Returns:
             Engagement score between 0 and 100
         """
-        # Weights for different factors
-        TURN_WEIGHT = 2.0  # Points per turn
-        DURATION_WEIGHT = 0.01  # Points per second
-        ENTITY_WEIGHT = 10.0  # Points per extracted entity
-        
-        # Calculate component scores
-        turn_score = min(metrics.turns * TURN_WEIGHT, 30)
-        duration_score = min(metrics.duration_seconds * DURATION_WEIGHT, 20)
-        entity_count = self.calculate_entity_count(intelligence)
-        entity_score = min(entity_count * ENTITY_WEIGHT, 50)
+        # Component scores, each capped by capping its count
+        turn_score = _TURN_WEIGHT * min(metrics.turns, _TURN_CAP)
+        duration_score = _DURATION_WEIGHT * min(metrics.duration_seconds, _DURATION_CAP_SECONDS)
+        entity_score = _ENTITY_WEIGHT * min(
+            self.calculate_entity_count(intelligence), _ENTITY_CAP
+        )
         
-        # Total score capped at 100
+        # The caps sum to 100, so the total needs no cap of its own
         total_score = turn_score + duration_score + entity_score
         
         logger.debug(
-            f"Engagement score: {total_score:.1f} "
-            f"(turns={turn_score:.1f}, duration={duration_score:.1f}, entities={entity_score:.1f})"
+            "Engagement score: %.1f (turns=%.1f, duration=%.1f, entities=%.1f)",
+            total_score, turn_score, duration_score, entity_score
         )
         
-        return min(100.0, round(total_score, 1))
+        return round(total_score, 1)
 
 
 # Singleton instance
 _metrics_service = None
+_metrics_lock = threading.Lock()
 
 
 def get_metrics_service() -> MetricsService:
     """Get or create metrics service singleton"""
     global _metrics_service
     if _metrics_service is None:
-        _metrics_service = MetricsService()
+        with _metrics_lock:
+            # Re-checked under the lock so racing threads share one instance
+            if _metrics_service is None:
+                _metrics_service = MetricsService()
     return _metrics_service